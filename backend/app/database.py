@@ -1,9 +1,11 @@
 import os
-from supabase import create_client, Client
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 
 
 
@@ -11,24 +13,29 @@ load_dotenv()
 
 
 # Supabase client
-supabase: Optional[Client] = None
+supabase: Optional["Client"] = None
 
 async def init_db():
     """Initialize Supabase client."""
     global supabase
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
-    
+
     if not url or not key:
         raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
-    
+
+    # Imported here so the supabase SDK is only loaded when the app actually starts
+    from supabase import create_client
+
     supabase = create_client(url, key)
     print("Database initialized successfully")
 
-def get_db() -> Client:
+def warm_db():
+    """Issue a trivial query so the first request doesn't pay connection setup."""
+    get_db().table("agent_configs").select("id").limit(1).execute()
+
+def get_db() -> "Client":
     """Return Supabase client."""
     if supabase is None:
         raise RuntimeError("Database not initialized")
     return supabase
-
-
@@ -0,0 +1,214 @@
+import asyncio
+import os
+import time
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from .database import init_db, warm_db
+from .tracing import tracer
+from .services.openai_service import OpenAIService
+from .services.retell_service import RetellService
+from .services.call_processor import CallProcessor
+from .services.write_buffer import WriteBehindBuffer
+from .services.analytics_service import AnalyticsService
+from .services.recording_cache import RecordingCache
+from .services.priority_scheduler import PriorityScheduler
+from .services.reconciler import CallReconciler
+
+
+class ServiceContainer:
+    """Holds the shared service singletons for the lifetime of the app"""
+
+    # Requests can't be served without the database, so it gates readiness;
+    # a failed Retell or OpenAI warm-up only marks the service degraded
+    REQUIRED_WARMUPS = ("database",)
+
+    def __init__(self):
+        self._openai_service: Optional[OpenAIService] = None
+        self._retell_service: Optional[RetellService] = None
+        self._call_processor: Optional[CallProcessor] = None
+        self._write_buffer: Optional[WriteBehindBuffer] = None
+        self._analytics_service: Optional[AnalyticsService] = None
+        self._recording_cache: Optional[RecordingCache] = None
+        self._scheduler: Optional[PriorityScheduler] = None
+        self._reconciler: Optional[CallReconciler] = None
+        self.ready = False
+        self.warmup_ms: Optional[float] = None
+        self.warmup: Dict[str, Any] = {}
+        self._warmup_retries: List[asyncio.Task] = []
+
+    @property
+    def openai_service(self) -> OpenAIService:
+        if self._openai_service is None:
+            self._openai_service = OpenAIService()
+        return self._openai_service
+
+    @property
+    def retell_service(self) -> RetellService:
+        if self._retell_service is None:
+            self._retell_service = RetellService()
+        return self._retell_service
+
+    @property
+    def write_buffer(self) -> WriteBehindBuffer:
+        if self._write_buffer is None:
+            self._write_buffer = WriteBehindBuffer(
+                flush_interval_ms=int(os.getenv("WRITE_FLUSH_INTERVAL_MS", "5")),
+                max_batch_rows=int(os.getenv("WRITE_FLUSH_MAX_ROWS", "100"))
+            )
+        return self._write_buffer
+
+    @property
+    def analytics_service(self) -> AnalyticsService:
+        if self._analytics_service is None:
+            self._analytics_service = AnalyticsService()
+        return self._analytics_service
+
+    @property
+    def recording_cache(self) -> RecordingCache:
+        if self._recording_cache is None:
+            self._recording_cache = RecordingCache(
+                cache_dir=os.getenv("RECORDING_CACHE_DIR", "recording_cache"),
+                max_bytes=int(os.getenv("RECORDING_CACHE_MAX_MB", "1024")) * 1024 * 1024
+            )
+        return self._recording_cache
+
+    @property
+    def scheduler(self) -> PriorityScheduler:
+        if self._scheduler is None:
+            self._scheduler = PriorityScheduler(
+                high_slots=int(os.getenv("PRIORITY_HIGH_SLOTS", "2")),
+                normal_slots=int(os.getenv("PRIORITY_NORMAL_SLOTS", "4")),
+                high_slo_ms=float(os.getenv("PRIORITY_HIGH_SLO_MS", "5000"))
+            )
+        return self._scheduler
+
+    @property
+    def reconciler(self) -> CallReconciler:
+        if self._reconciler is None:
+            self._reconciler = CallReconciler(
+                call_processor=self.call_processor,
+                retell_service=self.retell_service,
+                write_buffer=self.write_buffer,
+                stale_after_s=int(os.getenv("RECONCILE_STALE_AFTER_S", "900")),
+                concurrency=int(os.getenv("RECONCILE_CONCURRENCY", "5"))
+            )
+        return self._reconciler
+
+    @property
+    def call_processor(self) -> CallProcessor:
+        if self._call_processor is None:
+            self._call_processor = CallProcessor(
+                openai_service=self.openai_service,
+                retell_service=self.retell_service,
+                write_buffer=self.write_buffer,
+                analytics_service=self.analytics_service
+            )
+        return self._call_processor
+
+    async def startup(self):
+        """Connect to the database and pre-warm upstream connections in parallel"""
+        started = time.perf_counter()
+        tracer.configure(
+            enabled=os.getenv("TRACING_ENABLED", "true").lower() == "true",
+            file_path=os.getenv("TRACE_FILE"),
+            collector_url=os.getenv("TRACE_COLLECTOR_URL"),
+            file_max_bytes=int(os.getenv("TRACE_FILE_MAX_MB", "50")) * 1024 * 1024
+        )
+        await tracer.start()
+        await init_db()
+        await self.write_buffer.start()
+        await self.scheduler.start()
+
+        warmups = {
+            "database": lambda: asyncio.to_thread(warm_db),
+            "retell": self.retell_service.warm,
+            "openai": lambda: asyncio.to_thread(self.openai_service.warm),
+        }
+        await asyncio.gather(*(self._warm(name, warm) for name, warm in warmups.items()))
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"Services {self.status} in {self.warmup_ms} ms")
+
+        # Keep retrying failed warm-ups so the service recovers without a restart
+        self._warmup_retries = [
+            asyncio.create_task(self._retry_warmup(name, warm))
+            for name, warm in warmups.items() if not self.warmup[name]["ok"]
+        ]
+
+        if os.getenv("RECONCILER_ENABLED", "true").lower() == "true":
+            await self.reconciler.start()
+
+    @property
+    def status(self) -> str:
+        if not self.ready:
+            return "unavailable" if self.warmup else "starting"
+        return "ready" if all(w["ok"] for w in self.warmup.values()) else "degraded"
+
+    async def shutdown(self):
+        self.ready = False
+        for task in self._warmup_retries:
+            task.cancel()
+        await asyncio.gather(*self._warmup_retries, return_exceptions=True)
+        if self._reconciler is not None:
+            await self._reconciler.stop()
+        # Stop taking work first so queued webhooks can still buffer their writes
+        if self._call_processor is not None:
+            await self._call_processor.drain_dispatch()
+        if self._scheduler is not None:
+            await self._scheduler.stop()
+        if self._write_buffer is not None:
+            await self._write_buffer.stop()
+        if self._retell_service is not None:
+            await self._retell_service.aclose()
+        if self._recording_cache is not None:
+            await self._recording_cache.aclose()
+        await tracer.stop()
+
+    async def _warm(self, name: str, warm: Callable[[], Awaitable[Any]]):
+        started = time.perf_counter()
+        try:
+            await warm()
+            self.warmup[name] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+            self.warmup[name] = {"ok": False, "error": str(e)}
+        self.ready = all(self.warmup.get(required, {}).get("ok") for required in self.REQUIRED_WARMUPS)
+
+    async def _retry_warmup(self, name: str, warm: Callable[[], Awaitable[Any]]):
+        delay = 1.0
+        while not self.warmup[name]["ok"]:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+            await self._warm(name, warm)
+        print(f"Warm-up of {name} succeeded on retry; services {self.status}")
+
+
+container = ServiceContainer()
+
+
+def get_openai_service() -> OpenAIService:
+    """Return the shared OpenAI service."""
+    return container.openai_service
+
+def get_retell_service() -> RetellService:
+    """Return the shared Retell service."""
+    return container.retell_service
+
+def get_write_buffer() -> WriteBehindBuffer:
+    """Return the shared write-behind buffer."""
+    return container.write_buffer
+
+def get_analytics_service() -> AnalyticsService:
+    """Return the shared analytics service."""
+    return container.analytics_service
+
+def get_recording_cache() -> RecordingCache:
+    """Return the shared recording cache."""
+    return container.recording_cache
+
+def get_scheduler() -> PriorityScheduler:
+    """Return the shared priority scheduler."""
+    return container.scheduler
+
+def get_call_processor() -> CallProcessor:
+    """Return the shared call processor."""
+    return container.call_processor
@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+import time
+
+# Taken before any other import so cold-start time includes module loading
+PROCESS_START = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse
 import os
 from dotenv import load_dotenv
 
@@ -9,14 +15,31 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .routes import router
-from .database import init_db
+from .dependencies import container
+from .profiling import ProfilingMiddleware, ProfileStore
+
+
+# Cold-start timings, filled in as the app comes up
+cold_start = {
+    "startup_ms": None,
+    "first_request_ms": None,
+}
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize database connection and pre-warm upstream services
+    await container.startup()
+    cold_start["startup_ms"] = round((time.perf_counter() - PROCESS_START) * 1000, 1)
+    print(f"Cold start to ready: {cold_start['startup_ms']} ms")
+    yield
+    await container.shutdown()
 
 
 app = FastAPI(
     title="AI Voice Agent Tool",
     description="Backend API for AI Voice Agent Management",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -28,10 +51,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize database connection
-@app.on_event("startup")
-async def startup():
-    await init_db()
+# Record time from process start to the first request served. Plain ASGI
+# rather than @app.middleware so the request stays in a single task, which
+# the profiler below relies on.
+class FirstRequestTimer:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if scope["type"] == "http" and cold_start["first_request_ms"] is None:
+            cold_start["first_request_ms"] = round((time.perf_counter() - PROCESS_START) * 1000, 1)
+            print(f"Cold start to first served request: {cold_start['first_request_ms']} ms")
+
+app.add_middleware(FirstRequestTimer)
+
+# On-demand request profiling (off unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+profile_store = ProfileStore(
+    os.getenv("PROFILE_DIR", "profiles"),
+    max_profiles=int(os.getenv("PROFILE_MAX_FILES", "200"))
+)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    token=PROFILE_TOKEN,
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+    interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+)
 
 # Include routes
 app.include_router(router, prefix="/api")
@@ -45,6 +92,33 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    body = {
+        "status": container.status,
+        "warmup_ms": container.warmup_ms,
+        "warmup": container.warmup,
+        "cold_start": cold_start,
+    }
+    return JSONResponse(status_code=200 if container.ready else 503, content=body)
+
+def require_profile_token(request: Request):
+    if not PROFILE_TOKEN or request.headers.get("x-profile") != PROFILE_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling access denied")
+
+@app.get("/profiles")
+async def list_profiles(request: Request):
+    require_profile_token(request)
+    return {"success": True, "data": profile_store.list()}
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, request: Request):
+    require_profile_token(request)
+    path = profile_store.folded_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
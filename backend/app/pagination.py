@@ -0,0 +1,71 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional, List, Tuple, Dict, Any, Iterable
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    """Encode the (sort column, id) of the last row on a page as an opaque cursor"""
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        # Both values end up inside a PostgREST filter, so only accept well-formed ones
+        datetime.fromisoformat(sort_value)
+        return sort_value, str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], required: Iterable[str]) -> List[str]:
+    """Turn a comma-separated ``fields=`` value into a validated column list.
+
+    Columns in ``required`` (the keyset columns) are always selected so the
+    next cursor can be built.
+    """
+    allowed = list(allowed)
+    if not fields:
+        return allowed
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    columns = list(requested)
+    for column in required:
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+def keyset_page(query, sort_column: str, limit: int, cursor: Optional[str]):
+    """Apply newest-first keyset pagination on (sort_column, id) to a Supabase query.
+
+    Fetches one extra row to know whether another page exists, so the
+    caller should pass the result to ``finish_page``.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.or_(
+            f'{sort_column}.lt."{sort_value}",'
+            f'and({sort_column}.eq."{sort_value}",id.lt.{row_id})'
+        )
+    return query.order(sort_column, desc=True).order("id", desc=True).limit(limit + 1)
+
+def finish_page(rows: List[Dict[str, Any]], sort_column: str, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last[sort_column], last["id"])
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Where time is spent, by the first matching frame (innermost first)
+_CATEGORIES = (
+    ("supabase", ("postgrest/", "supabase/", "database.py", "write_buffer.py")),
+    ("retell", ("retell_service.py",)),
+    ("openai", ("openai/", "openai_service.py")),
+)
+
+
+class AsyncSampler:
+    """Wall-clock sampling profiler for a single asyncio task.
+
+    A background thread periodically records the task's stack. While the
+    task is suspended the stack comes from its chain of awaiting coroutines,
+    so time spent waiting on Supabase, Retell or OpenAI is attributed to the
+    code that awaited it; while it is running the event loop thread's own
+    stack is appended, which also covers blocking calls.
+    """
+
+    def __init__(self, task: asyncio.Task, interval_s: float = 0.001):
+        self.task = task
+        self.interval = interval_s
+        self.loop_thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.wall_s = 0.0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.wall_s = time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                stack = self._sample()
+            except Exception:
+                # The task's frames can change under us; just skip this sample
+                continue
+            if stack:
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def _sample(self) -> List[str]:
+        chain = _await_chain(self.task.get_coro())
+        if not chain:
+            return []
+        labels = [_frame_label(frame) for frame, _ in chain]
+
+        innermost, awaiting = chain[-1]
+        thread_frames = _thread_stack(sys._current_frames().get(self.loop_thread_id))
+        if innermost in thread_frames:
+            # Running: continue down the loop thread's stack from our innermost coroutine
+            position = thread_frames.index(innermost)
+            labels.extend(_frame_label(frame) for frame in thread_frames[position + 1:])
+        elif awaiting is not None:
+            labels.append("<awaiting future>" if type(awaiting).__name__ == "FutureIter" else f"<awaiting {type(awaiting).__name__}>")
+        return labels
+
+    def folded(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        """Wall-clock milliseconds per upstream, scaled from the sample counts"""
+        if not self.samples:
+            return {}
+        totals: Counter = Counter()
+        for stack, count in self.stacks.items():
+            totals[_categorize(stack)] += count
+        scale = self.wall_s * 1000 / self.samples
+        return {category: round(count * scale, 1) for category, count in totals.most_common()}
+
+
+class ProfilingMiddleware:
+    """Opt-in per-request profiling.
+
+    A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or
+    is picked by ``PROFILE_SAMPLE_RATE``. The collapsed stacks and a summary
+    go to the profile store and the profile id is returned in the
+    ``X-Profile-Id`` response header. Requests that aren't profiled go
+    straight through.
+    """
+
+    def __init__(self, app, store: "ProfileStore", token: Optional[str] = None,
+                 sample_rate: float = 0.0, interval_ms: float = 1.0):
+        self.app = app
+        self.store = store
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        sampler = AsyncSampler(asyncio.current_task(), self.interval)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            self.store.save(profile_id, sampler, scope)
+
+    def _wants_profile(self, scope) -> bool:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == b"x-profile" and value == self.token:
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+
+class ProfileStore:
+    """Profiles on disk: ``<id>.folded`` stacks plus ``<id>.json`` summary"""
+
+    def __init__(self, profile_dir: str, max_profiles: int = 200):
+        self.dir = Path(profile_dir)
+        self.max_profiles = max_profiles
+
+    def save(self, profile_id: str, sampler: AsyncSampler, scope):
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            (self.dir / f"{profile_id}.folded").write_text(sampler.folded())
+            summary = {
+                "id": profile_id,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "created_at": time.time(),
+                "wall_ms": round(sampler.wall_s * 1000, 1),
+                "samples": sampler.samples,
+                "breakdown_ms": sampler.breakdown_ms(),
+            }
+            (self.dir / f"{profile_id}.json").write_text(json.dumps(summary))
+            print(f"Profiled {summary['method']} {summary['path']}: {summary['wall_ms']} ms {summary['breakdown_ms']}")
+            self._prune()
+        except Exception as e:
+            print(f"Error saving profile {profile_id}: {e}")
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not self.dir.exists():
+            return []
+        summaries = []
+        for path in self.dir.glob("*.json"):
+            try:
+                summaries.append(json.loads(path.read_text()))
+            except Exception:
+                continue
+        return sorted(summaries, key=lambda s: s["created_at"], reverse=True)
+
+    def folded_path(self, profile_id: str) -> Optional[Path]:
+        # Ids are uuid hex; anything else can't name a stored profile
+        if not profile_id.isalnum():
+            return None
+        path = self.dir / f"{profile_id}.folded"
+        return path if path.exists() else None
+
+    def _prune(self):
+        summaries = sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in summaries[:max(0, len(summaries) - self.max_profiles)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def _await_chain(coro):
+    """[(frame, awaited object)] from the outermost coroutine inwards"""
+    chain = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            break
+        awaiting = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+        chain.append((frame, awaiting))
+        if isinstance(awaiting, asyncio.Task):
+            # Follow into tasks we wait on (e.g. shielded downloads)
+            awaiting = awaiting.get_coro()
+        coro = awaiting if hasattr(awaiting, "cr_frame") or hasattr(awaiting, "gi_frame") or hasattr(awaiting, "ag_frame") else None
+    return chain
+
+
+def _thread_stack(frame) -> list:
+    """Frames of a thread from the outermost call inwards"""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Keep the package directories so library frames can be told apart
+    short_path = "/".join(code.co_filename.replace(os.sep, "/").split("/")[-3:])
+    return f"{code.co_name} ({short_path}:{code.co_firstlineno})"
+
+
+def _categorize(stack) -> str:
+    for frame_label in reversed(stack):
+        for category, markers in _CATEGORIES:
+            if any(marker in frame_label for marker in markers):
+                return category
+    return "app"
@@ -1,27 +1,61 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import os
 import uuid
 from datetime import datetime
 
 from .database import get_db
 from .models import AgentConfigCreate, AgentConfigUpdate, CallCreate, RetellWebhook
-from .services.retell_service import RetellService
-from .services.call_processor import CallProcessor
+from .pagination import parse_fields, clamp_limit, keyset_page, finish_page
+from .dependencies import get_retell_service, get_call_processor, get_write_buffer, get_analytics_service, get_recording_cache, get_scheduler
+from .services.recording_cache import parse_range, iter_file, sniff_audio_type
+from .tracing import tracer, build_timeline
 
 router = APIRouter()
-retell_service = RetellService()
-call_processor = CallProcessor()
+
+AGENT_CONFIG_COLUMNS = [
+    "id", "name", "scenario_type", "system_prompt", "conversation_flow",
+    "emergency_triggers", "max_retries", "interruption_sensitivity",
+    "backchannel_enabled", "filler_words_enabled", "created_at", "updated_at"
+]
+
+CALL_COLUMNS = [
+    "id", "call_id", "agent_config_id", "driver_name", "driver_phone", "load_number",
+    "call_status", "started_at", "ended_at", "duration", "created_at"
+]
 
 # -----------------------
 # Agent Config Endpoints
 # -----------------------
 
 @router.get("/agent-configs")
-async def get_agent_configs():
+async def get_agent_configs(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    scenario_type: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
     try:
         db = get_db()
-        response = db.table("agent_configs").select("*").order("created_at", desc=True).execute()
-        return {"success": True, "data": response.data}
+        limit = clamp_limit(limit)
+        columns = parse_fields(fields, AGENT_CONFIG_COLUMNS, ["created_at", "id"])
+
+        query = db.table("agent_configs").select(",".join(columns))
+        if scenario_type:
+            query = query.eq("scenario_type", scenario_type)
+        if created_after:
+            query = query.gte("created_at", created_after.isoformat())
+        if created_before:
+            query = query.lt("created_at", created_before.isoformat())
+        response = keyset_page(query, "created_at", limit, cursor).execute()
+
+        configs, next_cursor = finish_page(response.data or [], "created_at", limit)
+        return {"success": True, "data": configs, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching agent configs: {e}")
 
@@ -110,7 +144,8 @@ async def start_call(call_data: CallCreate):
             "load_number": call_data.load_number
         }
 
-        # 4️⃣ Insert initial call record in DB
+        # 4️⃣ Insert initial call record in DB (buffered, coalesced with the status update below)
+        write_buffer = get_write_buffer()
         call_record = {
             "call_id": str(uuid.uuid4()),
             "agent_config_id": call_data.agent_config_id,
@@ -121,25 +156,23 @@ async def start_call(call_data: CallCreate):
             "transcript": "",
             "duration": 0
         }
-        call_response = db.table("calls").insert(call_record, returning="representation").execute()
-        if not call_response.data:
-            raise HTTPException(status_code=500, detail="Failed to create call record")
-        created_call = call_response.data[0]
-
-        # 5️⃣ Start WebRTC session
-        retell_response = await retell_service.create_webrtc_session(
-            agent_config=agent_config_payload,
-            context=context
-        )
-
-        # 6️⃣ Update DB status
-        db.table("calls").update({
-            "call_status": "in_progress"
-        }).eq("call_id", created_call["call_id"]).execute()
+        with tracer.span("start_call", call_id=call_record["call_id"]):
+            write_buffer.insert("calls", call_record, key_column="call_id")
+
+            # 5️⃣ Start WebRTC session
+            retell_response = await get_retell_service().create_webrtc_session(
+                agent_config=agent_config_payload,
+                context=context
+            )
+
+            # 6️⃣ Update DB status
+            write_buffer.update("calls", "call_id", call_record["call_id"], {
+                "call_status": "in_progress"
+            })
 
         return {
             "success": True,
-            "call_id": created_call["call_id"],
+            "call_id": call_record["call_id"],
             "token": retell_response["token"],
             "agent_id": retell_response["agent_id"],
             "message": "WebRTC call ready"
@@ -151,18 +184,50 @@ async def start_call(call_data: CallCreate):
 
 
 @router.get("/calls")
-async def get_calls():
+async def get_calls(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    status: Optional[str] = None,
+    agent_config_id: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None
+):
     try:
         db = get_db()
-        response = db.table("calls").select("*").order("started_at", desc=True).execute()
-        calls_data = response.data or []
-
-        # Map agent names manually
-        for call in calls_data:
-            agent_response = db.table("agent_configs").select("name").eq("id", call["agent_config_id"]).execute()
-            call["agent_name"] = agent_response.data[0]["name"] if agent_response.data else None
-
-        return {"success": True, "data": calls_data}
+        limit = clamp_limit(limit)
+        columns = parse_fields(fields, CALL_COLUMNS + ["agent_name"], ["started_at", "id"])
+        include_agent_name = "agent_name" in columns
+        columns = [c for c in columns if c != "agent_name"]
+        if include_agent_name and "agent_config_id" not in columns:
+            columns.append("agent_config_id")
+
+        query = db.table("calls").select(",".join(columns))
+        if status:
+            query = query.eq("call_status", status)
+        if agent_config_id:
+            query = query.eq("agent_config_id", agent_config_id)
+        if started_after:
+            query = query.gte("started_at", started_after.isoformat())
+        if started_before:
+            query = query.lt("started_at", started_before.isoformat())
+        response = keyset_page(query, "started_at", limit, cursor).execute()
+
+        calls_data, next_cursor = finish_page(response.data or [], "started_at", limit)
+
+        # Map agent names with one lookup for the whole page
+        if include_agent_name:
+            agent_ids = list({call["agent_config_id"] for call in calls_data if call.get("agent_config_id")})
+            names = {}
+            if agent_ids:
+                agent_response = db.table("agent_configs").select("id, name").in_("id", agent_ids).execute()
+                names = {agent["id"]: agent["name"] for agent in agent_response.data or []}
+            for call in calls_data:
+                call["agent_name"] = names.get(call.get("agent_config_id"))
+
+        return {"success": True, "data": calls_data, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching calls: {e}")
 
@@ -170,7 +235,7 @@ async def get_calls():
 @router.get("/calls/{call_id}")
 async def get_call_details(call_id: str):
     try:
-        result = await call_processor.get_call_summary(call_id)
+        result = await get_call_processor().get_call_summary(call_id)
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         return {"success": True, "data": result}
@@ -190,19 +255,71 @@ async def get_call_results(call_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching call results: {e}")
 
 
+@router.get("/calls/{call_id}/timeline")
+async def get_call_timeline(call_id: str):
+    """Traced phases of a recent call (keyed by the Retell call id) and their critical path"""
+    spans = tracer.get_spans(call_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="No trace recorded for this call")
+    return {"success": True, "data": build_timeline(spans)}
+
+
+@router.get("/calls/{call_id}/recording")
+async def get_call_recording(call_id: str, request: Request):
+    async def resolve_recording_url():
+        details = await get_retell_service().get_call_details(call_id)
+        return details.get("recording_url") if details else None
+
+    try:
+        f = await get_recording_cache().open(call_id, resolve_recording_url)
+        if f is None:
+            raise HTTPException(status_code=404, detail="Recording not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error fetching recording: {e}")
+
+    size = os.fstat(f.fileno()).st_size
+    headers = {"Accept-Ranges": "bytes"}
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        f.close()
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+
+    media_type = sniff_audio_type(f)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(iter_file(f, start, end), status_code=status_code, media_type=media_type, headers=headers)
+
+
 # -----------------------
 # Retell Webhook
 # -----------------------
 
 @router.post("/retell-webhook")
-async def retell_webhook(webhook_data: RetellWebhook, background_tasks: BackgroundTasks):
+async def retell_webhook(webhook_data: RetellWebhook):
     try:
-        background_tasks.add_task(call_processor.handle_retell_webhook, webhook_data.dict())
+        call_processor = get_call_processor()
+        payload = webhook_data.dict()
+        with tracer.span("webhook.received", call_id=payload["data"].get("call_id"), event=payload["event"]):
+            call_processor.dispatch_webhook(payload, get_scheduler())
         return {"success": True, "message": "Webhook received"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@router.get("/scheduler/stats")
+async def get_scheduler_stats():
+    return {"success": True, "data": get_scheduler().stats()}
+
+
 # -----------------------
 # Dashboard Stats
 # -----------------------
@@ -246,3 +363,22 @@ async def get_dashboard_stats():
             }
         }
 
+
+# -----------------------
+# Agent Analytics
+# -----------------------
+
+@router.get("/analytics/agents")
+async def get_agent_analytics(
+    granularity: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    agent_config_id: Optional[str] = None
+):
+    try:
+        data = get_analytics_service().get_agent_analytics(granularity, since, until, agent_config_id)
+        return {"success": True, "data": data}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching agent analytics: {e}")
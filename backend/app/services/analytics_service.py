@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Union
+from ..database import get_db
+
+# Widest window each granularity can be queried over, so a request reads at
+# most (agents x buckets) rollup rows no matter how many calls were made
+MAX_WINDOW = {
+    "hour": timedelta(days=7),
+    "day": timedelta(days=366),
+}
+
+DEFAULT_WINDOW = {
+    "hour": timedelta(hours=24),
+    "day": timedelta(days=30),
+}
+
+
+class AnalyticsService:
+    """Per-agent call analytics backed by pre-aggregated rollups"""
+
+    def record_call(
+        self,
+        call_id: str,
+        agent_config_id: str,
+        structured_data: Dict[str, Any],
+        duration: Optional[int],
+        occurred_at: Union[str, int, float, None] = None
+    ):
+        """Add a processed call to its agent's hourly and daily rollups.
+
+        Recorded at most once per call: reprocessing a call that is already
+        in the rollups leaves them unchanged.
+        """
+        db = get_db()
+        db.rpc("record_call_rollup", {
+            "p_call_id": call_id,
+            "p_agent_config_id": agent_config_id,
+            "p_occurred_at": self._to_iso(occurred_at),
+            "p_duration": duration,
+            "p_call_outcome": structured_data.get("call_outcome"),
+            "p_driver_status": structured_data.get("driver_status"),
+            "p_emergency_type": structured_data.get("emergency_type"),
+            "p_escalated": structured_data.get("escalation_status") == "Escalation Flagged"
+        }).execute()
+
+    def rebuild(self) -> int:
+        """Recompute every rollup from stored calls; returns the number of calls replayed"""
+        db = get_db()
+        response = db.rpc("rebuild_agent_call_rollups", {}).execute()
+        return response.data or 0
+
+    def get_agent_analytics(
+        self,
+        granularity: str = "day",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        agent_config_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Outcome mix, average duration and escalation rate per agent over time"""
+        if granularity not in MAX_WINDOW:
+            raise ValueError(f"granularity must be one of: {', '.join(MAX_WINDOW)}")
+
+        until = self._as_utc(until) if until else datetime.now(timezone.utc)
+        since = self._as_utc(since) if since else until - DEFAULT_WINDOW[granularity]
+        if until - since > MAX_WINDOW[granularity]:
+            raise ValueError(f"Window too large for '{granularity}' buckets (max {MAX_WINDOW[granularity].days} days)")
+
+        db = get_db()
+        query = db.table("agent_call_rollups").select("*") \
+            .eq("granularity", granularity) \
+            .gte("bucket_start", since.isoformat()) \
+            .lt("bucket_start", until.isoformat()) \
+            .order("bucket_start")
+        if agent_config_id:
+            query = query.eq("agent_config_id", agent_config_id)
+        rollups = query.execute().data or []
+
+        agents: Dict[str, Dict[str, Any]] = {}
+        for row in rollups:
+            agent = agents.setdefault(row["agent_config_id"], {
+                "agent_config_id": row["agent_config_id"],
+                "buckets": [],
+                "_totals": self._empty_totals()
+            })
+            agent["buckets"].append({"bucket_start": row["bucket_start"], **self._summarize(row)})
+            self._accumulate(agent["_totals"], row)
+
+        if agents:
+            names = db.table("agent_configs").select("id, name").in_("id", list(agents)).execute()
+            for config in names.data or []:
+                agents[config["id"]]["agent_name"] = config["name"]
+
+        for agent in agents.values():
+            agent["totals"] = self._summarize(agent.pop("_totals"))
+
+        return {
+            "granularity": granularity,
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "agents": list(agents.values())
+        }
+
+    def _empty_totals(self) -> Dict[str, Any]:
+        return {
+            "total_calls": 0,
+            "total_duration": 0,
+            "duration_samples": 0,
+            "escalated_calls": 0,
+            "call_outcome_counts": {},
+            "driver_status_counts": {},
+            "emergency_type_counts": {}
+        }
+
+    def _accumulate(self, totals: Dict[str, Any], row: Dict[str, Any]):
+        for column in ("total_calls", "total_duration", "duration_samples", "escalated_calls"):
+            totals[column] += row.get(column) or 0
+        for column in ("call_outcome_counts", "driver_status_counts", "emergency_type_counts"):
+            for key, count in (row.get(column) or {}).items():
+                totals[column][key] = totals[column].get(key, 0) + count
+
+    def _summarize(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        total_calls = row.get("total_calls") or 0
+        duration_samples = row.get("duration_samples") or 0
+        return {
+            "total_calls": total_calls,
+            "avg_duration": round(row["total_duration"] / duration_samples, 1) if duration_samples else None,
+            "escalation_rate": round(row["escalated_calls"] / total_calls, 4) if total_calls else None,
+            "call_outcomes": row.get("call_outcome_counts") or {},
+            "driver_statuses": row.get("driver_status_counts") or {},
+            "emergency_types": row.get("emergency_type_counts") or {}
+        }
+
+    def _as_utc(self, value: datetime) -> datetime:
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    def _to_iso(self, timestamp: Union[str, int, float, None]) -> str:
+        """Normalize Retell timestamps (epoch milliseconds or ISO strings) to ISO 8601"""
+        if isinstance(timestamp, (int, float)):
+            return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).isoformat()
+        if isinstance(timestamp, str) and timestamp:
+            return timestamp
+        return datetime.now(timezone.utc).isoformat()
+
+
+async def _rebuild():
+    from ..database import init_db
+    await init_db()
+    replayed = AnalyticsService().rebuild()
+    print(f"Rebuilt agent analytics rollups from {replayed} calls")
+
+
+if __name__ == "__main__":
+    # python -m app.services.analytics_service
+    asyncio.run(_rebuild())
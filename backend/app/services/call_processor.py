@@ -1,30 +1,89 @@
 import json
+import uuid
 import asyncio
-from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Union
 from ..database import get_db
 from .openai_service import OpenAIService
 from .retell_service import RetellService
+from .write_buffer import WriteBehindBuffer
+from .analytics_service import AnalyticsService
+from .priority_scheduler import HIGH, NORMAL, PriorityScheduler
+from .rule_extractor import DEFAULT_EMERGENCY_TRIGGERS, trigger_pattern
+from ..tracing import tracer
 
 class CallProcessor:
-    def __init__(self):
-        self.openai_service = OpenAIService()
-        self.retell_service = RetellService()
+    def __init__(
+        self,
+        write_buffer: WriteBehindBuffer,
+        openai_service: Optional[OpenAIService] = None,
+        retell_service: Optional[RetellService] = None,
+        analytics_service: Optional[AnalyticsService] = None
+    ):
+        # The shared, started buffer; a private one would never be flushed
+        self.write_buffer = write_buffer
+        self.openai_service = openai_service or OpenAIService()
+        self.retell_service = retell_service or RetellService()
+        self.analytics_service = analytics_service or AnalyticsService()
+        self._processing = set()  # Retell call ids currently being processed
+        self._dispatching = set()  # webhooks still being classified
 
-    async def process_completed_call(self, call_id: str, retell_call_id: str) -> Dict[str, Any]:
-        """Process a completed call and extract structured data"""
-        
+    async def process_completed_call(
+        self,
+        call_id: str,
+        retell_call_id: str,
+        retell_call_details: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Process a completed call and extract structured data.
+
+        Safe to call more than once for the same call (webhook retries, the
+        reconciler): a call already being processed or already completed is
+        skipped. A call the reconciler marked failed is processed and moves
+        to completed.
+        """
+        if retell_call_id in self._processing:
+            return {"success": True, "skipped": True, "message": "Call is already being processed"}
+
+        self._processing.add(retell_call_id)
         try:
+            with tracer.span("process_completed_call", call_id=retell_call_id):
+                return await self._process_completed_call(call_id, retell_call_id, retell_call_details)
+        finally:
+            self._processing.discard(retell_call_id)
+
+    async def _process_completed_call(
+        self,
+        call_id: str,
+        retell_call_id: str,
+        retell_call_details: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        try:
+            # Make sure buffered writes for this call are visible before reading it back
+            with tracer.span("db.flush"):
+                await self.write_buffer.flush()
+
             # Get call details from database
             db = get_db()
-            call_response = db.table("calls").select("*").eq("call_id", retell_call_id).execute()
+            # Queries and the analytics RPC are blocking; keep them off the event
+            # loop so jobs in other scheduler lanes keep running meanwhile
+            with tracer.span("db.load_call"):
+                call_response = await asyncio.to_thread(
+                    db.table("calls").select("*").eq("call_id", retell_call_id).execute
+                )
             
             if not call_response.data:
                 raise Exception(f"Call not found: {retell_call_id}")
             
             call_data = call_response.data[0]
+
+            if call_data.get("call_status") == "completed":
+                return {"success": True, "skipped": True, "message": "Call already processed"}
             
             # Get agent configuration
-            config_response = db.table("agent_configs").select("*").eq("id", call_data["agent_config_id"]).execute()
+            with tracer.span("db.load_agent_config"):
+                config_response = await asyncio.to_thread(
+                    db.table("agent_configs").select("*").eq("id", call_data["agent_config_id"]).execute
+                )
             
             if not config_response.data:
                 raise Exception(f"Agent config not found: {call_data['agent_config_id']}")
@@ -32,7 +91,8 @@ class CallProcessor:
             agent_config = config_response.data[0]
             
             # Get call details from Retell AI
-            retell_call_details = await self.retell_service.get_call_details(retell_call_id)
+            if retell_call_details is None:
+                retell_call_details = await self.retell_service.get_call_details(retell_call_id)
             
             if not retell_call_details:
                 raise Exception(f"Could not fetch call details from Retell: {retell_call_id}")
@@ -50,11 +110,14 @@ class CallProcessor:
                 # Process transcript with OpenAI
                 structured_data = await self.openai_service.process_transcript(
                     transcript, 
-                    agent_config["scenario_type"]
+                    agent_config["scenario_type"],
+                    agent_config.get("emergency_triggers")
                 )
             
-            # Save call results to database
+            # Save call results to database; one row per call, and the id is
+            # derived from the call so reprocessing overwrites rather than adds
             call_result_data = {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"call_results/{call_data['id']}")),
                 "call_id": call_data["id"],
                 "call_outcome": structured_data.get("call_outcome"),
                 "driver_status": structured_data.get("driver_status"),
@@ -68,21 +131,35 @@ class CallProcessor:
                 "processing_status": "processed"
             }
             
-            result_response = db.table("call_results").insert(call_result_data).execute()
+            self.write_buffer.insert("call_results", call_result_data, key_column="call_id", on_conflict="call_id")
             
             # Update call status
-            db.table("calls").update({
+            started_at = self._parse_timestamp(retell_call_details.get("start_timestamp"))
+            ended_at = self._parse_timestamp(retell_call_details.get("end_timestamp")) or datetime.now(timezone.utc)
+            duration = int((ended_at - started_at).total_seconds()) if started_at else None
+            self.write_buffer.update("calls", "call_id", retell_call_id, {
                 "call_status": "completed",
-                "ended_at": retell_call_details.get("end_timestamp"),
-                "duration": self._calculate_duration(
-                    retell_call_details.get("start_timestamp"),
-                    retell_call_details.get("end_timestamp")
-                )
-            }).eq("id", call_data["id"]).execute()
+                "ended_at": ended_at.isoformat(),
+                "duration": duration
+            })
+
+            # Roll the result into the per-agent analytics
+            try:
+                with tracer.span("analytics.record"):
+                    await asyncio.to_thread(
+                        self.analytics_service.record_call,
+                        call_data["id"],
+                        call_data["agent_config_id"],
+                        structured_data,
+                        duration,
+                        ended_at.isoformat()
+                    )
+            except Exception as e:
+                print(f"Error updating analytics rollups for call {call_id}: {e}")
             
             return {
                 "success": True,
-                "call_result_id": result_response.data[0]["id"],
+                "call_result_id": call_result_data["id"],
                 "structured_data": structured_data,
                 "transcript": transcript
             }
@@ -94,6 +171,60 @@ class CallProcessor:
                 "error": str(e)
             }
 
+    def dispatch_webhook(self, webhook_data: Dict[str, Any], scheduler: PriorityScheduler):
+        """Classify a webhook in the background and queue it in the chosen lane.
+
+        Classification needs a database lookup, so it runs after the webhook
+        has been acknowledged rather than on the request path.
+        """
+        task = asyncio.create_task(self._classify_and_submit(webhook_data, scheduler))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def drain_dispatch(self):
+        """Wait for webhooks still being classified to reach the scheduler"""
+        await asyncio.gather(*self._dispatching, return_exceptions=True)
+
+    async def _classify_and_submit(self, webhook_data: Dict[str, Any], scheduler: PriorityScheduler):
+        with tracer.span("webhook.classify") as span:
+            lane = await self.classify_webhook(webhook_data)
+            if span is not None:
+                span.attributes["lane"] = lane
+        scheduler.submit(lane, self.handle_retell_webhook, webhook_data)
+
+    async def classify_webhook(self, webhook_data: Dict[str, Any]) -> str:
+        """Pick the scheduler lane for a webhook.
+
+        Calls handled by an emergency-scenario agent, or whose transcript
+        mentions one of the agent's emergency triggers, go to the high lane.
+        """
+        call_data = webhook_data.get("data", {})
+        call_id = call_data.get("call_id")
+        if webhook_data.get("event") != "call_ended" or not call_id:
+            return NORMAL
+
+        scenario_type, triggers = None, DEFAULT_EMERGENCY_TRIGGERS
+        try:
+            db = get_db()
+            query = db.table("calls").select("agent_configs(scenario_type, emergency_triggers)") \
+                .eq("call_id", call_id).limit(1)
+            response = await asyncio.to_thread(query.execute)
+            agent_config = response.data[0].get("agent_configs") if response.data else None
+            if agent_config:
+                scenario_type = agent_config.get("scenario_type")
+                triggers = tuple(agent_config.get("emergency_triggers") or DEFAULT_EMERGENCY_TRIGGERS)
+        except Exception as e:
+            print(f"Error classifying webhook for call {call_id}: {e}")
+
+        if scenario_type == "emergency":
+            return HIGH
+
+        pattern = trigger_pattern(triggers)
+        transcript = call_data.get("transcript") or ""
+        if pattern is not None and pattern.search(transcript):
+            return HIGH
+        return NORMAL
+
     async def handle_retell_webhook(self, webhook_data: Dict[str, Any]) -> Dict[str, Any]:
         """Handle incoming Retell AI webhook"""
         
@@ -106,12 +237,16 @@ class CallProcessor:
         
         db = get_db()
         
+        with tracer.span(f"webhook.{event_type}", call_id=call_id):
+            return await self._handle_event(db, event_type, call_id, call_data)
+
+    async def _handle_event(self, db, event_type: str, call_id: str, call_data: Dict[str, Any]) -> Dict[str, Any]:
         try:
             if event_type == "call_started":
                 # Update call status to in_progress
-                db.table("calls").update({
+                self.write_buffer.update("calls", "call_id", call_id, {
                     "call_status": "in_progress"
-                }).eq("call_id", call_id).execute()
+                })
                 
                 return {"success": True, "message": "Call started"}
             
@@ -125,11 +260,16 @@ class CallProcessor:
                 transcript = call_data.get("transcript", "")
                 if transcript:
                     # Update existing call result with new transcript
-                    call_response = db.table("calls").select("id").eq("call_id", call_id).execute()
+                    with tracer.span("db.flush"):
+                        await self.write_buffer.flush()
+                    with tracer.span("db.load_call"):
+                        call_response = await asyncio.to_thread(
+                            db.table("calls").select("id").eq("call_id", call_id).execute
+                        )
                     if call_response.data:
-                        db.table("call_results").update({
+                        self.write_buffer.update("call_results", "call_id", call_response.data[0]["id"], {
                             "raw_transcript": transcript
-                        }).eq("call_id", call_response.data[0]["id"]).execute()
+                        })
                 
                 return {"success": True, "message": "Call analyzed"}
             
@@ -140,20 +280,19 @@ class CallProcessor:
             print(f"Error handling webhook: {e}")
             return {"success": False, "error": str(e)}
 
-    def _calculate_duration(self, start_time: str, end_time: str) -> Optional[int]:
-        """Calculate call duration in seconds"""
+    def _parse_timestamp(self, timestamp: Union[str, int, float, None]) -> Optional[datetime]:
+        """Parse a Retell timestamp (epoch milliseconds or an ISO string) as an aware UTC datetime"""
         try:
-            if not start_time or not end_time:
-                return None
-            
-            from datetime import datetime
-            start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-            end = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-            
-            duration = (end - start).total_seconds()
-            return int(duration)
-        except:
-            return None
+            if isinstance(timestamp, str) and timestamp.strip().isdigit():
+                timestamp = int(timestamp)
+            if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+                return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+            if isinstance(timestamp, str) and timestamp:
+                parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            pass
+        return None
 
     async def get_call_summary(self, call_id: str) -> Dict[str, Any]:
         """Get comprehensive call summary"""
@@ -1,22 +1,54 @@
 import os
-import openai
 import json
-from typing import Dict, Any, Optional
+import asyncio
+from typing import Dict, Any, Optional, Sequence
+from . import rule_extractor
+from ..tracing import tracer
 
 class OpenAIService:
     def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-    async def process_transcript(self, transcript: str, scenario_type: str) -> Dict[str, Any]:
+        self._client = None
+        self.fast_path_min_confidence = float(
+            os.getenv("RULE_FASTPATH_MIN_CONFIDENCE", str(rule_extractor.DEFAULT_MIN_CONFIDENCE))
+        )
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use so the SDK isn't imported at startup"""
+        if self._client is None:
+            import openai
+            openai.api_key = os.getenv("OPENAI_API_KEY")
+            self._client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def warm(self):
+        """Import the SDK and open the HTTP connection ahead of the first extraction"""
+        self.client.models.list()
+
+    async def process_transcript(
+        self,
+        transcript: str,
+        scenario_type: str,
+        emergency_triggers: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
         """Process raw transcript and extract structured data"""
         
         if scenario_type == "check_in":
-            return await self._process_checkin_transcript(transcript)
+            # Plainly stated check-ins don't need the LLM
+            with tracer.span("rules.extract") as span:
+                fast_result = rule_extractor.extract(transcript, emergency_triggers)
+                if span is not None:
+                    span.attributes["confidence"] = fast_result["confidence"]
+            if fast_result["confidence"] >= self.fast_path_min_confidence:
+                return fast_result
+            with tracer.span("openai.extract", scenario=scenario_type, model="gpt-4"):
+                return await self._process_checkin_transcript(transcript)
         elif scenario_type == "emergency":
-            return await self._process_emergency_transcript(transcript)
+            with tracer.span("openai.extract", scenario=scenario_type, model="gpt-4"):
+                return await self._process_emergency_transcript(transcript)
         else:
-            return await self._process_generic_transcript(transcript)
+            with tracer.span("openai.extract", scenario=scenario_type, model="gpt-3.5-turbo"):
+                return await self._process_generic_transcript(transcript)
 
     async def _process_checkin_transcript(self, transcript: str) -> Dict[str, Any]:
         """Process check-in call transcript"""
@@ -41,7 +73,9 @@ class OpenAIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
+            # The SDK call is blocking; run it off the event loop
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are an expert at analyzing logistics call transcripts. Return only valid JSON."},
@@ -80,7 +114,8 @@ class OpenAIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "You are an expert at analyzing emergency logistics calls. Return only valid JSON."},
@@ -116,7 +151,8 @@ class OpenAIService:
         """
 
         try:
-            response = self.client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model="gpt-3.5-turbo",
                 messages=[
                     {"role": "system", "content": "You are an expert at analyzing call transcripts. Return only valid JSON."},
@@ -0,0 +1,111 @@
+import asyncio
+import contextvars
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from ..tracing import tracer
+
+HIGH = "high"
+NORMAL = "normal"
+
+
+class Lane:
+    """A queue with its own pool of worker slots"""
+
+    def __init__(self, name: str, slots: int, slo_ms: Optional[float] = None):
+        self.name = name
+        self.slots = slots
+        self.slo_ms = slo_ms
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.slo_breaches = 0
+        self.wait_ms = deque(maxlen=1000)  # recent queue wait times
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self.wait_ms)
+        return {
+            "slots": self.slots,
+            "queued": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "slo_ms": self.slo_ms,
+            "slo_breaches": self.slo_breaches,
+            "wait_ms": {
+                "p50": _percentile(waits, 0.50),
+                "p95": _percentile(waits, 0.95),
+                "max": waits[-1] if waits else None,
+            },
+        }
+
+
+class PriorityScheduler:
+    """Runs background jobs in priority lanes.
+
+    Each lane has its own worker slots, so a burst of routine work queued in
+    the normal lane can never hold up a job in the high-priority lane.
+    """
+
+    def __init__(self, high_slots: int = 2, normal_slots: int = 4, high_slo_ms: Optional[float] = 5000):
+        self.lanes: Dict[str, Lane] = {
+            HIGH: Lane(HIGH, high_slots, high_slo_ms),
+            NORMAL: Lane(NORMAL, normal_slots),
+        }
+
+    def submit(self, lane: str, fn: Callable[..., Awaitable[Any]], *args):
+        """Queue ``fn(*args)`` to run in the given lane, in the caller's context"""
+        job = (time.perf_counter(), time.time(), contextvars.copy_context(), fn, args)
+        self.lanes[lane].queue.put_nowait(job)
+
+    async def start(self):
+        for lane in self.lanes.values():
+            lane.workers = [asyncio.create_task(self._worker(lane)) for _ in range(lane.slots)]
+
+    async def stop(self, timeout: float = 30.0):
+        """Let queued jobs finish (up to ``timeout`` seconds), then stop the workers"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(lane.queue.join() for lane in self.lanes.values())),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            print("Priority scheduler stopped with jobs still queued")
+        for lane in self.lanes.values():
+            for worker in lane.workers:
+                worker.cancel()
+            await asyncio.gather(*lane.workers, return_exceptions=True)
+            lane.workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    async def _worker(self, lane: Lane):
+        while True:
+            enqueued_at, enqueued_wall, context, fn, args = await lane.queue.get()
+            waited_ms = round((time.perf_counter() - enqueued_at) * 1000, 1)
+            lane.wait_ms.append(waited_ms)
+            context.run(tracer.record, "scheduler.queue_wait", enqueued_wall, waited_ms, lane=lane.name)
+            if lane.slo_ms is not None and waited_ms > lane.slo_ms:
+                lane.slo_breaches += 1
+                print(f"{lane.name} lane job waited {waited_ms} ms (SLO {lane.slo_ms} ms)")
+
+            lane.in_flight += 1
+            try:
+                # Run in the submitter's context so tracing follows the job
+                await context.run(asyncio.create_task, fn(*args))
+                lane.completed += 1
+            except Exception as e:
+                lane.failed += 1
+                print(f"Error running {lane.name} lane job: {e}")
+            finally:
+                lane.in_flight -= 1
+                lane.queue.task_done()
+
+
+def _percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    return values[min(int(len(values) * fraction), len(values) - 1)]
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Tuple
+from ..database import get_db
+from .call_processor import CallProcessor
+from .retell_service import RetellService
+from .write_buffer import WriteBehindBuffer
+
+# Retell call states that mean the call is over
+ENDED_STATES = ("ended",)
+ERROR_STATES = ("error",)
+
+
+class CallReconciler:
+    """Finishes calls whose ``call_ended`` webhook never arrived.
+
+    Periodically picks up calls that have been ``initiated``/``in_progress``
+    for too long, asks Retell for their state a bounded number at a time, and
+    hands the ones that ended to ``CallProcessor.process_completed_call``,
+    which skips calls a webhook has already handled. The polling interval
+    shrinks while stale calls keep turning up and backs off when there are
+    none.
+    """
+
+    def __init__(
+        self,
+        call_processor: CallProcessor,
+        retell_service: RetellService,
+        write_buffer: WriteBehindBuffer,
+        stale_after_s: int = 900,
+        abandon_after_s: int = 86400,
+        batch_size: int = 50,
+        concurrency: int = 5,
+        min_interval_s: float = 15,
+        max_interval_s: float = 300
+    ):
+        self.call_processor = call_processor
+        self.retell_service = retell_service
+        self.write_buffer = write_buffer
+        self.stale_after = timedelta(seconds=stale_after_s)
+        self.abandon_after = timedelta(seconds=abandon_after_s)
+        self.batch_size = batch_size
+        self.min_interval = min_interval_s
+        self.max_interval = max_interval_s
+        self.interval = min_interval_s
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # (started_at, id) of the last call seen in the current sweep
+        self._sweep_from: Optional[Tuple[str, str]] = None
+        self._stopped = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """Reconcile one batch of stale calls"""
+        now = datetime.now(timezone.utc)
+        db = get_db()
+        # Served by idx_calls_status_started_at_id
+        query = db.table("calls").select("id, call_id, call_status, started_at") \
+            .in_("call_status", ["initiated", "in_progress"]) \
+            .lt("started_at", (now - self.stale_after).isoformat())
+        if self._sweep_from:
+            # Keyset on (started_at, id) so calls sharing the boundary timestamp aren't skipped
+            started_at, call_row_id = self._sweep_from
+            query = query.or_(
+                f'started_at.gt."{started_at}",'
+                f'and(started_at.eq."{started_at}",id.gt.{call_row_id})'
+            )
+        query = query.order("started_at").order("id").limit(self.batch_size)
+        response = await asyncio.to_thread(query.execute)
+        stale_calls = response.data or []
+
+        # Walk through all stale calls in started_at order, one batch per pass,
+        # so calls Retell still reports as live don't starve the rest
+        full_batch = len(stale_calls) >= self.batch_size
+        self._sweep_from = (stale_calls[-1]["started_at"], stale_calls[-1]["id"]) if full_batch else None
+
+        outcomes = await asyncio.gather(*(self._reconcile(call, now) for call in stale_calls))
+        counts = {"stale": len(stale_calls), "more": int(full_batch), "completed": 0, "failed": 0, "still_active": 0, "skipped": 0}
+        for outcome in outcomes:
+            counts[outcome] += 1
+        return counts
+
+    async def _reconcile(self, call: Dict[str, Any], now: datetime) -> str:
+        call_id = call["call_id"]
+        async with self._semaphore:
+            try:
+                # Raises on timeouts, rate limits and server errors, so only a
+                # call Retell reports as missing can be abandoned
+                details = await self.retell_service.find_call(call_id)
+                if details is None:
+                    # Retell has no record of it; give up once it's clearly abandoned
+                    if self._age(call, now) > self.abandon_after:
+                        self.write_buffer.update("calls", "call_id", call_id, {"call_status": "failed"})
+                        return "failed"
+                    return "skipped"
+
+                retell_status = details.get("call_status")
+                if retell_status in ENDED_STATES:
+                    result = await self.call_processor.process_completed_call(call_id, call_id, details)
+                    if result.get("skipped"):
+                        return "skipped"
+                    return "completed" if result.get("success") else "skipped"
+                if retell_status in ERROR_STATES:
+                    self.write_buffer.update("calls", "call_id", call_id, {"call_status": "failed"})
+                    return "failed"
+                return "still_active"
+            except Exception as e:
+                print(f"Error reconciling call {call_id}: {e}")
+                return "skipped"
+
+    async def _run(self):
+        while not self._stopped.is_set():
+            try:
+                counts = await self.run_once()
+                if counts["stale"]:
+                    print(f"Reconciled stale calls: {counts}")
+                self._adapt(counts)
+            except Exception as e:
+                print(f"Error running call reconciler: {e}")
+                self.interval = self.max_interval
+            try:
+                await asyncio.wait_for(self._stopped.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _adapt(self, counts: Dict[str, int]):
+        if counts["more"]:
+            # Finish the sweep before waiting again
+            self.interval = 0
+        elif counts["completed"] or counts["failed"]:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, max(self.interval, self.min_interval) * 2)
+
+    def _age(self, call: Dict[str, Any], now: datetime) -> timedelta:
+        try:
+            started_at = datetime.fromisoformat(call["started_at"].replace("Z", "+00:00"))
+            return now - started_at
+        except Exception:
+            return timedelta(0)
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, BinaryIO, Callable, Dict, Optional
+
+import httpx
+
+
+class RecordingCache:
+    """Size-bounded LRU cache of call recordings on local disk.
+
+    Concurrent requests for a recording that isn't cached yet share a single
+    upstream download, so many reviewers opening the same call only fetch it
+    from Retell once.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, client: Optional[httpx.AsyncClient] = None, chunk_size: int = 64 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._client = client
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # file name -> size, least recently used first
+        self._total_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._load_index()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=60.0, follow_redirects=True)
+        return self._client
+
+    async def open(self, key: str, resolve_url: Callable[[], Awaitable[Optional[str]]],
+                   max_attempts: int = 3) -> Optional[BinaryIO]:
+        """Open the cached recording for ``key``, downloading it first if needed.
+
+        ``resolve_url`` is only awaited on a cache miss and returns the
+        upstream URL, or None if there is no recording. The file is opened
+        here, with no await between the lookup and the open, so eviction
+        can't remove it before the caller has a handle; an open handle keeps
+        working after the file is unlinked.
+        """
+        name = self._file_name(key)
+        for _ in range(max_attempts):
+            if name in self._entries:
+                try:
+                    f = open(self.cache_dir / name, "rb")
+                except FileNotFoundError:
+                    # Removed behind our back; forget it and download again
+                    self._total_bytes -= self._entries.pop(name)
+                else:
+                    self._touch(name)
+                    return f
+
+            task = self._inflight.get(name)
+            if task is None:
+                task = asyncio.create_task(self._download(name, resolve_url))
+                self._inflight[name] = task
+                task.add_done_callback(lambda _: self._inflight.pop(name, None))
+            # Shield so one client disconnecting doesn't cancel the download others wait on
+            if await asyncio.shield(task) is None:
+                return None
+            # Loop to open it; if another download evicted it meanwhile, fetch it again
+        raise RuntimeError(f"Recording {key} was evicted before it could be opened")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _download(self, name: str, resolve_url: Callable[[], Awaitable[Optional[str]]]) -> Optional[Path]:
+        url = await resolve_url()
+        if not url:
+            return None
+
+        path = self.cache_dir / name
+        partial = path.with_suffix(".part")
+        size = 0
+        try:
+            async with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(partial, "wb") as f:
+                    async for chunk in response.aiter_bytes(self.chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(partial, path)
+        except Exception:
+            partial.unlink(missing_ok=True)
+            raise
+
+        self._entries[name] = size
+        self._total_bytes += size
+        self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: str):
+        """Drop least recently used recordings until the cache fits in max_bytes"""
+        for name in list(self._entries):
+            if self._total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            # Readers that already opened the file keep streaming it after unlink
+            (self.cache_dir / name).unlink(missing_ok=True)
+            self._total_bytes -= self._entries.pop(name)
+
+    def _touch(self, name: str):
+        self._entries.move_to_end(name)
+        try:
+            os.utime(self.cache_dir / name)
+        except OSError:
+            pass
+
+    def _load_index(self):
+        """Rebuild the LRU order from files left by a previous run"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".part":
+                path.unlink(missing_ok=True)
+            elif path.is_file():
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def _file_name(self, key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single ``bytes=`` Range header into an inclusive (start, end).
+
+    Returns None when there is no usable range (serve the whole file) and
+    raises ValueError when the range can't be satisfied.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges aren't worth supporting for audio seeking
+        return None
+
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if not start_text:
+            # bytes=-N: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise ValueError("Unsatisfiable range")
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+    except ValueError:
+        raise ValueError("Unsatisfiable range")
+
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def iter_file(f: BinaryIO, start: int, end: int, chunk_size: int = 64 * 1024):
+    """Yield bytes start..end (inclusive) of an open file in chunks, then close it"""
+    with f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def sniff_audio_type(f: BinaryIO) -> str:
+    """Guess the audio MIME type from the file header"""
+    f.seek(0)
+    header = f.read(12)
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header[:3] == b"ID3" or header[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    if header[:4] == b"OggS":
+        return "audio/ogg"
+    return "application/octet-stream"
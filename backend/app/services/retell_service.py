@@ -3,6 +3,7 @@ import httpx
 import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from ..tracing import tracer
 
 class RetellService:
     def __init__(self):
@@ -12,6 +13,26 @@ class RetellService:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client so connections to Retell are pooled across requests"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+        return self._client
+
+    async def warm(self):
+        """Open a pooled connection to Retell ahead of the first real call.
+
+        Any HTTP response means the connection is up; connection errors raise.
+        """
+        await self.client.get(self.base_url)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def create_phone_call(self, phone_number: str, agent_config: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Create a phone call using Retell AI"""
@@ -44,19 +65,17 @@ class RetellService:
             }
         }
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
+        try:
+            with tracer.span("retell.create_phone_call"):
+                response = await self.client.post(
                     f"{self.base_url}/create-phone-call",
-                    headers=self.headers,
-                    json=call_payload,
-                    timeout=30.0
+                    json=call_payload
                 )
                 response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                print(f"Retell API error: {e}")
-                raise Exception(f"Failed to create call: {str(e)}")
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"Retell API error: {e}")
+            raise Exception(f"Failed to create call: {str(e)}")
 
     def _build_dynamic_prompt(self, agent_config: Dict[str, Any], context: Dict[str, Any]) -> str:
         """Build a dynamic prompt based on agent configuration and call context"""
@@ -95,31 +114,34 @@ class RetellService:
         
         return base_prompt + context_prompt
 
+    async def find_call(self, call_id: str) -> Optional[Dict[str, Any]]:
+        """Get call details from Retell AI, or None if Retell has no such call.
+
+        Unlike ``get_call_details``, timeouts, rate limits and server errors
+        raise ``httpx.HTTPError``, so a missing call can be told apart from
+        one that couldn't be looked up.
+        """
+        with tracer.span("retell.get_call_details", call_id=call_id):
+            response = await self.client.get(f"{self.base_url}/get-call/{call_id}")
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+        return response.json()
+
     async def get_call_details(self, call_id: str) -> Optional[Dict[str, Any]]:
         """Get call details from Retell AI"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/get-call/{call_id}",
-                    headers=self.headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError as e:
-                print(f"Error fetching call details: {e}")
-                return None
+        try:
+            return await self.find_call(call_id)
+        except httpx.HTTPError as e:
+            print(f"Error fetching call details: {e}")
+            return None
 
     async def list_agents(self) -> List[Dict[str, Any]]:
         """List all agents"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/list-agents",
-                    headers=self.headers,
-                    timeout=30.0
-                )
+        try:
+            with tracer.span("retell.list_agents"):
+                response = await self.client.get(f"{self.base_url}/list-agents")
                 response.raise_for_status()
-                return response.json()
-            except httpx.HTTPError:
-                return []
\ No newline at end of file
+            return response.json()
+        except httpx.HTTPError:
+            return []
\ No newline at end of file
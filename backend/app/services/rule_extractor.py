@@ -0,0 +1,290 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+# Confidence at or above which a rule-based result is used instead of the LLM
+DEFAULT_MIN_CONFIDENCE = 0.85
+
+# Matches the triggers seeded for the default agents in database/schema.sql
+DEFAULT_EMERGENCY_TRIGGERS = (
+    "emergency", "accident", "breakdown", "blowout", "medical", "help", "crash", "stuck", "fire", "injured"
+)
+
+
+@lru_cache(maxsize=128)
+def trigger_pattern(triggers: Tuple[str, ...]) -> Optional["re.Pattern"]:
+    """Compile one whole-word, case-insensitive pattern for a set of trigger phrases"""
+    phrases = [re.escape(t.strip()) for t in triggers if t and t.strip()]
+    if not phrases:
+        return None
+    return re.compile(r"\b(?:" + "|".join(phrases) + r")\b", re.IGNORECASE)
+
+
+_TIME = r"(?:\d{1,2}(?::\d{2})?\s*(?:[ap]\.?\s?m\.?)|\d{1,2}:\d{2}|noon|midnight)"
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "fifteen": 15,
+    "twenty": 20, "thirty": 30, "forty": 40, "forty-five": 45, "half an": 0.5,
+}
+_COUNT = r"(?:\d+(?:\.\d+)?|half an|forty-five|" + "|".join(w for w in _NUMBER_WORDS if " " not in w and "-" not in w) + r")"
+
+# (pattern, case-insensitive) per signal. Order matters where phrases
+# overlap: earlier entries win, so emergency wording is never read as a
+# routine status (e.g. "stuck" in "stuck in traffic").
+_SIGNALS = {
+    "emergency": (
+        r"\b(?:emergency|accident|breakdown|broke\s+down|blowout|blew\s+a\s+tire|flat(?:\s+tire)?|smok(?:e|ing)|overheat(?:ing|ed)?"
+        r"|engine\s+(?:trouble|problems?|light)|tow(?:\s+truck)?|pulled\s+over|on\s+the\s+shoulder"
+        r"|wreck(?:ed)?|collision|jackknifed?|roll(?:ed)?\s+over|passed\s+out|unconscious|faint(?:ed)?"
+        r"|chest\s+pains?|bleeding|dizzy|sick|seizure|heart|stroke"
+        r"|medical|help|crash(?:ed)?|stuck|fire|injured|hurt|ambulance|police|911)\b",
+        True,
+    ),
+    "hedge": (
+        r"\b(?:not\s+sure|don'?t\s+know|no\s+idea|maybe|I\s+guess|hard\s+to\s+say|can'?t\s+say)\b",
+        True,
+    ),
+    "highway": (
+        r"\b(?:(?P<interstate>I|Interstate)[-\s]?(?P<i_num>\d{1,3})"
+        r"|(?P<kind>US|U\.S\.|Highway|Hwy|Route|SR|State Route)[-\s]?(?P<h_num>\d{1,4}))\b",
+        True,
+    ),
+    "mile_marker": (
+        r"\b(?:mile\s*marker|mile\s*post|MM|MP)\s*#?\s*(?P<mile_marker_value>\d{1,4}(?:\.\d)?)\b",
+        True,
+    ),
+    "eta": (
+        r"\b(?:ETA\s*(?:is|of|should\s+be|:)?\s*(?:now\s+)?(?:about|around|roughly|like)?\s*"
+        r"|(?:arrive|arriving|be\s+there|get\s+there|make\s+it|deliver(?:ing)?)\s+(?:at|around|about|by)\s+)"
+        r"(?P<time>" + _TIME + r")",
+        True,
+    ),
+    "eta_relative": (
+        r"\b(?:there|arrive|arriving|ETA|out|away)\b[^.?!\n]{0,20}?\bin\s+(?:about\s+|around\s+|roughly\s+)?"
+        r"(?P<count>" + _COUNT + r")\s+(?P<unit>hours?|hrs?|minutes?|mins?)\b",
+        True,
+    ),
+    "arrived": (
+        r"\b(?:(?:just\s+)?arrived|I'?m\s+here|I\s+am\s+here|pulled\s+in|checked\s+in|at\s+the\s+(?:dock|receiver|shipper|consignee|facility))\b",
+        True,
+    ),
+    "delayed": (
+        r"\b(?:delay(?:ed)?|running\s+(?:a\s+(?:bit|little)\s+)?(?:late|behind)|behind\s+schedule|in\s+traffic|heavy\s+traffic|road\s+construction)\b",
+        True,
+    ),
+    "driving": (
+        r"\b(?:driving|on\s+the\s+road|rolling|heading|en\s+route|on\s+my\s+way|headed|cruising|making\s+good\s+time)\b",
+        True,
+    ),
+    # Routine context that carries no field but shouldn't count as unexplained
+    "routine": (
+        r"\b(?:weigh\s+station|fuel(?:ing)?\s+stop|waiting\s+(?:for|on)\s+(?:a\s+|the\s+)?(?:door|dock|load|paperwork)"
+        r"|(?:\d+|" + "|".join(w for w in _NUMBER_WORDS if " " not in w and "-" not in w) + r")\s+(?:minutes?|mins?|hours?)\s+ago)\b",
+        True,
+    ),
+    # Place names must be capitalized, so only the lead-in words ignore case
+    "place": (
+        r"\b(?P<place_prep>(?i:near|in|outside(?:\s+of)?|just\s+(?:past|outside)|passing(?:\s+through)?|through|approaching|coming\s+into))\s+"
+        r"(?P<place_value>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?(?:,\s*[A-Z]{2}\b(?!\s*\d))?)",
+        False,
+    ),
+}
+
+# All signals in one alternation, so a transcript is scanned once rather
+# than once per signal; match.lastgroup names the signal that matched
+_COMBINED = re.compile("|".join(
+    f"(?P<{name}>{'(?i:' + source + ')' if ignorecase else source})"
+    for name, (source, ignorecase) in _SIGNALS.items()
+))
+
+# Words that carry no information of their own; any other word outside a
+# matched signal leaves the answer unexplained (see extract)
+_FILLER_WORDS = frozenset("""
+    a an the i i'm im i'll ill i've we we're my me you your it it's its is am are was were be been being
+    will would should could can and but so or then now just still yeah yes yep ok okay uh um well sir
+    ma'am hey hi hello thanks thank right about around roughly like on at to of for from by with into
+    near in out up down over past through get got getting make there here that this there's
+    north south east west northbound southbound eastbound westbound mile miles marker post
+    currently today tonight time
+""".split())
+_WORD = re.compile(r"[A-Za-z][A-Za-z'\-]*|\d+")
+# Highest confidence for an answer with unexplained words
+UNEXPLAINED_MAX_CONFIDENCE = 0.5
+
+# Lines spoken by the driver in a Retell transcript ("User: ...")
+_DRIVER_LINE = re.compile(r"^\s*(?:user|driver|caller)\s*:\s*(?P<text>.*)$", re.IGNORECASE | re.MULTILINE)
+_SPEAKER_LINE = re.compile(r"^\s*(?:agent|assistant|user|driver|caller)\s*:", re.IGNORECASE | re.MULTILINE)
+
+
+def driver_text(transcript: str) -> str:
+    """Keep only what the driver said, so the agent's questions aren't mistaken for answers"""
+    if not transcript:
+        return ""
+    if not _SPEAKER_LINE.search(transcript):
+        return transcript
+    return "\n".join(m.group("text") for m in _DRIVER_LINE.finditer(transcript))
+
+
+def extract(transcript: str, emergency_triggers: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Extract check-in fields from one transcript.
+
+    Only an answer fully explained by the matched signals can reach the
+    fast-path threshold; any other content word caps the confidence at
+    ``UNEXPLAINED_MAX_CONFIDENCE``, since an unrecognised clause ("my
+    co-driver passed out") may be the part that matters.
+
+    ``emergency_triggers`` are the agent's configured trigger phrases; if
+    the driver says any of them the result gets zero confidence, so the
+    call goes to the LLM and the escalation path.
+    """
+    text = driver_text(transcript)
+    found: Dict[str, List[re.Match]] = {name: [] for name in _SIGNALS}
+    unexplained, position = [], 0
+    for match in _COMBINED.finditer(text):
+        found[match.lastgroup].append(match)
+        unexplained.extend(_content_words(text[position:match.start()]))
+        position = match.end()
+    unexplained.extend(_content_words(text[position:]))
+
+    result = _build_result(found)
+    if unexplained:
+        result["confidence"] = min(result["confidence"], UNEXPLAINED_MAX_CONFIDENCE)
+
+    # The built-in emergency signal already covers the default triggers
+    pattern = trigger_pattern(tuple(emergency_triggers)) if emergency_triggers else None
+    if pattern is not None and pattern.search(text):
+        result["confidence"] = 0.0
+    return result
+
+
+def extract_batch(
+    transcripts: List[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    emergency_triggers: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Extract check-in fields from many transcripts, e.g. for a backfill.
+
+    With ``workers`` set, the batch is split into chunks that are processed
+    in parallel worker processes; results keep the input order.
+    """
+    extract_one = partial(extract, emergency_triggers=tuple(emergency_triggers) if emergency_triggers else None)
+    if not workers or workers < 2 or len(transcripts) <= chunk_size:
+        return [extract_one(t) for t in transcripts]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract_one, transcripts, chunksize=chunk_size))
+
+
+def _content_words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text) if word.lower() not in _FILLER_WORDS]
+
+
+def _build_result(found: Dict[str, List[re.Match]]) -> Dict[str, Any]:
+    highway = _highway(found["highway"][-1]) if found["highway"] else None
+    mile_marker = found["mile_marker"][-1].group("mile_marker_value") if found["mile_marker"] else None
+    place = _place(found["place"][-1]) if found["place"] else None
+    eta = _eta(found)
+
+    statuses = [s for s in ("arrived", "delayed", "driving") if found[s]]
+    if "arrived" in statuses:
+        driver_status = "Arrived"
+    elif "delayed" in statuses:
+        driver_status = "Delayed"
+    elif "driving" in statuses or highway or eta:
+        driver_status = "Driving"
+    else:
+        driver_status = None
+
+    location_parts = [p for p in (highway, place, f"mile marker {mile_marker}" if mile_marker else None) if p]
+    current_location = " ".join(location_parts) if location_parts else None
+
+    confidence = 0.0
+    if highway or place:
+        confidence += 0.4
+    if mile_marker:
+        confidence += 0.1
+    if eta or driver_status == "Arrived":
+        confidence += 0.3
+    if driver_status:
+        confidence += 0.2
+    if "arrived" in statuses and (eta or "driving" in statuses):
+        # "I'll have arrived by 5" style answers mix signals
+        confidence -= 0.3
+    if found["hedge"]:
+        confidence -= 0.2
+    if found["emergency"]:
+        # Emergencies always go to the LLM and the escalation path
+        confidence = 0.0
+    confidence = round(max(0.0, min(confidence, 1.0)), 2)
+
+    return {
+        "call_outcome": "Arrival Confirmation" if driver_status == "Arrived" else "In-Transit Update",
+        "driver_status": driver_status or "Unknown",
+        "current_location": current_location,
+        "eta": eta,
+        "highway": highway,
+        "mile_marker": mile_marker,
+        "emergency_type": None,
+        "emergency_location": None,
+        "escalation_status": None,
+        "additional_notes": "Extracted by rule-based fast path",
+        "extraction_method": "rules",
+        "confidence": confidence,
+    }
+
+
+def _highway(match: re.Match) -> str:
+    if match.group("interstate"):
+        return f"I-{match.group('i_num')}"
+    kind = match.group("kind").upper().replace(".", "")
+    if kind in ("HIGHWAY", "HWY"):
+        kind = "Highway"
+    elif kind in ("ROUTE", "STATE ROUTE"):
+        kind = "Route"
+    return f"{kind}-{match.group('h_num')}" if kind in ("US", "SR") else f"{kind} {match.group('h_num')}"
+
+
+def _place(match: re.Match) -> str:
+    """The place with the driver's own preposition, e.g. 'just past Tucson' or 'in Dallas'"""
+    preposition = " ".join(match.group("place_prep").lower().split())
+    if preposition == "outside of":
+        preposition = "outside"
+    return f"{preposition} {match.group('place_value')}"
+
+
+def _eta(found: Dict[str, List[re.Match]]) -> Optional[str]:
+    if found["eta"]:
+        return normalize_time(found["eta"][-1].group("time"))
+    if found["eta_relative"]:
+        match = found["eta_relative"][-1]
+        count = match.group("count").lower()
+        unit = "hour" if match.group("unit").lower().startswith("h") else "minute"
+        amount = _NUMBER_WORDS.get(count, count)
+        if amount == 0.5:
+            return "in 30 minutes"
+        plural = "" if str(amount) in ("1", "1.0") else "s"
+        return f"in {amount} {unit}{plural}"
+    return None
+
+
+_CLOCK = re.compile(r"(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<period>[ap])?", re.IGNORECASE)
+
+def normalize_time(text: str) -> str:
+    """Normalize a spoken clock time to e.g. '4:30 PM'"""
+    lowered = text.lower().strip()
+    if lowered == "noon":
+        return "12:00 PM"
+    if lowered == "midnight":
+        return "12:00 AM"
+    match = _CLOCK.match(lowered)
+    if not match:
+        return text
+    hour, minute = int(match.group("hour")), match.group("minute") or "00"
+    period = match.group("period")
+    if period is None:
+        if hour <= 12 or hour > 23:
+            # "4:30" could be either; keep it as said
+            return f"{hour}:{minute}"
+        period, hour = "p", hour - 12
+    return f"{hour}:{minute} {period.upper()}M"
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from ..database import get_db
+from ..tracing import tracer
+
+# Call statuses in lifecycle order; a buffered status never moves a call backwards.
+# "failed" can still become "completed": the reconciler marks calls failed when
+# Retell reports an error or has no record, and a late call_ended webhook that
+# then gets the call processed is the better evidence.
+STATUS_RANK = {
+    "initiated": 0,
+    "in_progress": 1,
+    "failed": 2,
+    "completed": 3,
+}
+
+
+class PendingWrite:
+    """Coalesced writes for one row that haven't reached the database yet"""
+
+    def __init__(self, table: str, key_column: str, key: str):
+        self.table = table
+        self.key_column = key_column
+        self.key = key
+        self.insert: Optional[Dict[str, Any]] = None
+        self.on_conflict: Optional[str] = None
+        self.update: Dict[str, Any] = {}
+        self.attempts = 0
+        self.first_failed_at: Optional[float] = None
+        self.next_retry_at = 0.0  # time.monotonic() before which the write isn't retried
+        self.call_ids = set()  # traced calls that buffered a write to this row
+
+
+class WriteBehindBuffer:
+    """Buffers row writes per call and flushes them to Supabase in batches.
+
+    Repeated updates to the same row are merged, an update to a row whose
+    insert is still buffered is folded into that insert, and a status that
+    would move a call backwards (e.g. a late ``call_started`` webhook after
+    ``call_ended``) is dropped. A single flusher writes batches in order, so
+    writes for any one call land in the order they were made.
+
+    If a batch fails, its rows are written one at a time so a single bad
+    row can't fail the others. Rows that still fail go straight back into
+    the buffer, merged under anything buffered for the same row since, so
+    a newer write never reaches the database ahead of an older one. They
+    are retried with exponential backoff starting at ``retry_interval_s``
+    (up to ``max_retry_interval_s``) and dropped once they have been
+    failing for ``give_up_after_s``.
+    """
+
+    def __init__(self, flush_interval_ms: int = 5, max_batch_rows: int = 100,
+                 retry_interval_s: float = 1.0, max_retry_interval_s: float = 30.0,
+                 give_up_after_s: float = 600.0):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self.retry_interval = retry_interval_s
+        self.max_retry_interval = max_retry_interval_s
+        self.give_up_after = give_up_after_s
+        self._pending: Dict[Tuple[str, str, str], PendingWrite] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def insert(self, table: str, row: Dict[str, Any], key_column: str, on_conflict: Optional[str] = None):
+        """Buffer a row insert. ``on_conflict`` names the unique column used for the upsert"""
+        pending = self._get_pending(table, key_column, row[key_column])
+        self._trace(pending)
+        pending.insert = dict(row)
+        pending.on_conflict = on_conflict or key_column
+        self._merge_into(pending.insert, pending.update)
+        pending.update = {}
+        self._notify()
+
+    def update(self, table: str, key_column: str, key: str, values: Dict[str, Any]):
+        """Buffer an update of the row(s) where ``key_column == key``"""
+        pending = self._get_pending(table, key_column, key)
+        self._trace(pending)
+        self._merge_into(pending.insert if pending.insert is not None else pending.update, values)
+        self._notify()
+
+    async def flush(self):
+        """Write everything buffered so far, except rows waiting to be retried"""
+        async with self._flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                started, started_at = time.time(), time.perf_counter()
+                failed = await asyncio.to_thread(self._write_batch, batch)
+                self._record_batch(batch, started, (time.perf_counter() - started_at) * 1000)
+                # Requeue before taking the next batch, so newer writes for a
+                # failed row are merged behind it rather than sent ahead of it
+                for pending in failed:
+                    self._requeue(pending)
+
+    async def start(self):
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write out anything still buffered"""
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        # One last attempt for rows still backing off
+        for pending in self._pending.values():
+            pending.next_retry_at = 0.0
+        await self.flush()
+        if self._pending:
+            print(f"Write buffer stopped with {len(self._pending)} unwritten rows: {list(self._pending)}")
+
+    async def _run(self):
+        while not self._closed:
+            wait = self._next_retry_in()
+            if wait is None or wait > 0:
+                try:
+                    # Sleep until new writes arrive or the next failed row is due
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if len(self._pending) < self.max_batch_rows and not self._closed:
+                # Give closely spaced writes a moment to coalesce
+                await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error flushing buffered writes: {e}")
+
+    def _notify(self):
+        self._wakeup.set()
+
+    def _get_pending(self, table: str, key_column: str, key: str) -> PendingWrite:
+        pending_key = (table, key_column, key)
+        pending = self._pending.get(pending_key)
+        if pending is None:
+            pending = PendingWrite(table, key_column, key)
+            self._pending[pending_key] = pending
+        return pending
+
+    def _trace(self, pending: PendingWrite):
+        call_id = tracer.current_call_id()
+        if call_id:
+            pending.call_ids.add(call_id)
+
+    def _record_batch(self, batch: List[PendingWrite], started: float, duration_ms: float):
+        """Record the batch write on the trace of every call that had a row in it"""
+        rows_by_call: Dict[str, int] = {}
+        for pending in batch:
+            for call_id in pending.call_ids:
+                rows_by_call[call_id] = rows_by_call.get(call_id, 0) + 1
+        for call_id, rows in rows_by_call.items():
+            tracer.record("db.write", started, duration_ms, call_id=call_id, rows=rows, batch_rows=len(batch))
+
+    def _merge_into(self, target: Dict[str, Any], values: Dict[str, Any]):
+        for column, value in values.items():
+            if column == "call_status" and not self._status_advances(target.get(column), value):
+                continue
+            target[column] = value
+
+    def _status_advances(self, current: Optional[str], new: Optional[str]) -> bool:
+        if current is None or new is None:
+            return True
+        return new == current or STATUS_RANK.get(new, 0) > STATUS_RANK.get(current, 0)
+
+    def _next_retry_in(self) -> Optional[float]:
+        """Seconds until the earliest buffered row can be written, None if nothing is buffered"""
+        if not self._pending:
+            return None
+        return max(0.0, min(p.next_retry_at for p in self._pending.values()) - time.monotonic())
+
+    def _requeue(self, failed: PendingWrite):
+        """Put a failed write back, under anything buffered for the same row since"""
+        now = time.monotonic()
+        failed.attempts += 1
+        if failed.first_failed_at is None:
+            failed.first_failed_at = now
+        if now - failed.first_failed_at >= self.give_up_after:
+            print(f"Dropping write to {failed.table} {failed.key_column}={failed.key} "
+                  f"after {failed.attempts} attempts over {now - failed.first_failed_at:.0f}s")
+            return
+        backoff = min(self.retry_interval * 2 ** (failed.attempts - 1), self.max_retry_interval)
+        failed.next_retry_at = now + backoff
+
+        pending_key = (failed.table, failed.key_column, failed.key)
+        newer = self._pending.get(pending_key)
+        if newer is None:
+            self._pending[pending_key] = failed
+            return
+        # The merged write carries the failed one, so it inherits its retry schedule
+        newer.attempts, newer.first_failed_at, newer.next_retry_at = failed.attempts, failed.first_failed_at, failed.next_retry_at
+        newer.call_ids |= failed.call_ids
+        if newer.insert is not None:
+            # A later insert of the whole row supersedes the failed write
+            return
+        if failed.insert is not None:
+            newer.insert, newer.on_conflict = failed.insert, failed.on_conflict
+            self._merge_into(newer.insert, newer.update)
+            newer.update = {}
+        else:
+            merged = dict(failed.update)
+            self._merge_into(merged, newer.update)
+            newer.update = merged
+
+    def _take_batch(self) -> List[PendingWrite]:
+        """Up to max_batch_rows buffered rows, skipping failed rows whose retry isn't due"""
+        now = time.monotonic()
+        keys = [key for key, pending in self._pending.items() if pending.next_retry_at <= now][:self.max_batch_rows]
+        return [self._pending.pop(key) for key in keys]
+
+    def _write_batch(self, batch: List[PendingWrite]) -> List[PendingWrite]:
+        """Write a batch and return the writes that failed"""
+        try:
+            db = get_db()
+        except Exception as e:
+            print(f"Error writing buffered batch: {e}")
+            return list(batch)
+        failed: List[PendingWrite] = []
+
+        # Inserts first: any update buffered after an insert was already folded into it
+        inserts: Dict[Tuple[str, str], List[PendingWrite]] = {}
+        for pending in batch:
+            if pending.insert is not None:
+                inserts.setdefault((pending.table, pending.on_conflict), []).append(pending)
+        for (table, on_conflict), group in inserts.items():
+            failed.extend(self._write_group(
+                group, lambda rows: db.table(table).upsert([p.insert for p in rows], on_conflict=on_conflict).execute()
+            ))
+
+        # Partial rows can't go through an upsert (NOT NULL columns), so rows
+        # receiving identical values share one UPDATE ... WHERE key IN (...)
+        updates: Dict[Tuple[str, str, str], List[PendingWrite]] = {}
+        for pending in batch:
+            if pending.insert is None and pending.update:
+                values_key = json.dumps(pending.update, sort_keys=True, default=str)
+                updates.setdefault((pending.table, pending.key_column, values_key), []).append(pending)
+        for (table, key_column, _), group in updates.items():
+            failed.extend(self._write_group(
+                group, lambda rows: self._update_query(db, table, key_column, rows).execute()
+            ))
+        return failed
+
+    def _write_group(self, group: List[PendingWrite], write) -> List[PendingWrite]:
+        """Write rows in one statement, falling back to one row at a time if it fails"""
+        try:
+            write(group)
+            return []
+        except Exception as e:
+            if len(group) == 1:
+                print(f"Error writing {group[0].table} {group[0].key_column}={group[0].key}: {e}")
+                return group
+            print(f"Error writing {len(group)} {group[0].table} rows, retrying one at a time: {e}")
+        failed = []
+        for pending in group:
+            failed.extend(self._write_group([pending], write))
+        return failed
+
+    def _update_query(self, db, table: str, key_column: str, group: List[PendingWrite]):
+        values = group[0].update
+        query = db.table(table).update(values).in_(key_column, [pending.key for pending in group])
+        status = values.get("call_status")
+        if table == "calls" and status is not None:
+            # Never let a stale transition overwrite a later status already stored
+            rank = STATUS_RANK.get(status, 0)
+            query = query.in_("call_status", [s for s, r in STATUS_RANK.items() if r < rank or s == status])
+        return query
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+import httpx
+
+# Call id and innermost open span for the code currently running; both
+# follow the asyncio context, so tasks created inside a span inherit them
+_current_call_id: ContextVar[Optional[str]] = ContextVar("trace_call_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, call_id: Optional[str], parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.call_id = call_id
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start = time.time()
+        self.duration_ms: Optional[float] = None
+        self._started = time.perf_counter()
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "call_id": self.call_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class FileSpanExporter:
+    """Appends finished spans to a JSON-lines file, rotated by size.
+
+    Spans are buffered and written in batches from the tracer's flush task,
+    so the event loop never waits on the disk.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 3, max_buffer: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer = deque(maxlen=max_buffer)
+
+    def export(self, span: Dict[str, Any]):
+        self._buffer.append(span)
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        batch = [self._buffer.popleft() for _ in range(len(self._buffer))]
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except OSError as e:
+            print(f"Error writing spans to {self.path}: {e}")
+
+    async def aclose(self):
+        await self.flush()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(span, default=str) + "\n" for span in batch)
+        if self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        """spans.jsonl -> spans.jsonl.1 -> ... -> spans.jsonl.<backups>, dropping the oldest"""
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+
+class HttpSpanExporter:
+    """Posts finished spans in batches to a local collector"""
+
+    def __init__(self, url: str, max_buffer: int = 10000, batch_size: int = 500):
+        self.url = url
+        self.batch_size = batch_size
+        self._buffer = deque(maxlen=max_buffer)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def export(self, span: Dict[str, Any]):
+        self._buffer.append(span)
+
+    async def flush(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=5.0)
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await self._client.post(self.url, json={"spans": batch})
+            except httpx.HTTPError as e:
+                print(f"Error exporting spans to {self.url}: {e}")
+                return
+
+    async def aclose(self):
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class Tracer:
+    """Span-based tracing keyed by call id.
+
+    Finished spans are kept in memory for the most recent calls (for the
+    timeline endpoint) and handed to the configured exporters, which a
+    background task flushes once a second.
+    """
+
+    def __init__(self, max_calls: int = 1000, max_spans_per_call: int = 500):
+        self.enabled = True
+        self.max_calls = max_calls
+        self.max_spans_per_call = max_spans_per_call
+        self.exporters: List[Any] = []
+        self._calls: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def configure(self, enabled: bool = True, file_path: Optional[str] = None, collector_url: Optional[str] = None,
+                  file_max_bytes: int = 50 * 1024 * 1024):
+        self.enabled = enabled
+        self.exporters = []
+        if enabled and file_path:
+            self.exporters.append(FileSpanExporter(file_path, max_bytes=file_max_bytes))
+        if enabled and collector_url:
+            self.exporters.append(HttpSpanExporter(collector_url))
+
+    @contextmanager
+    def span(self, name: str, call_id: Optional[str] = None, **attributes):
+        """Time a block of code as a span of ``call_id`` (or the current call)"""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        call_id = call_id or _current_call_id.get()
+        span = Span(name, call_id, parent.span_id if parent and parent.call_id == call_id else None, attributes)
+        span_token = _current_span.set(span)
+        call_token = _current_call_id.set(call_id)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            _current_call_id.reset(call_token)
+            _current_span.reset(span_token)
+            span.finish()
+            self._finish(span)
+
+    def record(self, name: str, start: float, duration_ms: float, call_id: Optional[str] = None, **attributes):
+        """Record a span measured elsewhere, e.g. time spent waiting in a queue"""
+        if not self.enabled:
+            return
+        parent = _current_span.get()
+        call_id = call_id or _current_call_id.get()
+        span = Span(name, call_id, parent.span_id if parent and parent.call_id == call_id else None, attributes)
+        span.start = start
+        span.duration_ms = round(duration_ms, 2)
+        self._finish(span)
+
+    def current_call_id(self) -> Optional[str]:
+        return _current_call_id.get()
+
+    def get_spans(self, call_id: str) -> List[Dict[str, Any]]:
+        """Spans held in memory for a call; older calls are only in the exporters"""
+        with self._lock:
+            return list(self._calls.get(call_id, []))
+
+    async def start(self, flush_interval_s: float = 1.0):
+        if self.exporters:
+            self._flush_task = asyncio.create_task(self._flush_loop(flush_interval_s))
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        for exporter in self.exporters:
+            await exporter.aclose()
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            for exporter in self.exporters:
+                await exporter.flush()
+
+    def _finish(self, span: Span):
+        data = span.to_dict()
+        if span.call_id:
+            with self._lock:
+                spans = self._calls.get(span.call_id)
+                if spans is None:
+                    spans = self._calls[span.call_id] = []
+                    if len(self._calls) > self.max_calls:
+                        self._calls.popitem(last=False)
+                else:
+                    self._calls.move_to_end(span.call_id)
+                if len(spans) < self.max_spans_per_call:
+                    spans.append(data)
+        for exporter in self.exporters:
+            exporter.export(data)
+
+
+tracer = Tracer()
+
+
+def build_timeline(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Order a call's spans into phases and mark the critical path.
+
+    Among sibling spans the critical path is found by walking backwards
+    from the one whose work finished last to the one that finished last
+    before it started, and so on; it then descends into each of those.
+    Work is measured over a span's whole subtree, since jobs queued from a
+    webhook keep running after the webhook request itself has returned.
+    """
+    if not spans:
+        return {"phases": [], "critical_path": [], "total_ms": 0}
+
+    spans = sorted(spans, key=lambda s: s["start"])
+    origin = spans[0]["start"]
+    by_id = {s["span_id"]: s for s in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in spans:
+        parent_id = s["parent_id"] if s["parent_id"] in by_id else None
+        children.setdefault(parent_id, []).append(s)
+
+    def end(s):
+        return s["start"] + (s["duration_ms"] or 0) / 1000
+
+    depth = {s["span_id"]: _depth(s, by_id) for s in spans}
+    subtree_end: Dict[str, float] = {}
+    # Deepest first, so every child's subtree is known before its parent's
+    for s in sorted(spans, key=lambda s: depth[s["span_id"]], reverse=True):
+        subtree_end[s["span_id"]] = max([end(s)] + [subtree_end[c["span_id"]] for c in children.get(s["span_id"], [])])
+
+    def critical_chain(siblings):
+        chain = []
+        remaining = list(siblings)
+        while remaining:
+            last = max(remaining, key=lambda s: subtree_end[s["span_id"]])
+            chain.append(last)
+            remaining = [s for s in remaining if subtree_end[s["span_id"]] <= last["start"]]
+        critical = []
+        for s in reversed(chain):
+            critical.append(s["span_id"])
+            critical.extend(critical_chain(children.get(s["span_id"], [])))
+        return critical
+
+    critical = critical_chain(children.get(None, []))
+    critical_ids = set(critical)
+
+    phases = [{
+        "name": s["name"],
+        "span_id": s["span_id"],
+        "parent_id": s["parent_id"],
+        "depth": depth[s["span_id"]],
+        "offset_ms": round((s["start"] - origin) * 1000, 2),
+        "duration_ms": s["duration_ms"],
+        "status": s["status"],
+        "attributes": s["attributes"],
+        "on_critical_path": s["span_id"] in critical_ids,
+    } for s in spans]
+
+    return {
+        "phases": phases,
+        "critical_path": [by_id[span_id]["name"] for span_id in critical],
+        "total_ms": round((max(end(s) for s in spans) - origin) * 1000, 2),
+    }
+
+
+def _depth(span: Dict[str, Any], by_id: Dict[str, Dict[str, Any]]) -> int:
+    level = 0
+    while span["parent_id"] in by_id:
+        span = by_id[span["parent_id"]]
+        level += 1
+    return level
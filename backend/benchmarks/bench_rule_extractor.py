@@ -0,0 +1,99 @@
+"""Accuracy and speed of the rule-based check-in extractor.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_rule_extractor [--corpus PATH] [--repeat N]
+
+Accuracy is measured on the labeled corpus: coverage is the share of
+transcripts the fast path accepts, unsafe accepts are transcripts labeled
+as needing the LLM (emergencies, vague answers) that it accepted anyway,
+and field accuracy is computed over the accepted transcripts only, since
+those are the results that skip the LLM.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from app.services.rule_extractor import extract, extract_batch, DEFAULT_MIN_CONFIDENCE
+
+FIELDS = ("driver_status", "highway", "mile_marker", "eta", "current_location", "call_outcome")
+DEFAULT_CORPUS = Path(__file__).with_name("rule_extractor_corpus.jsonl")
+
+
+def load_corpus(path: Path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(corpus, min_confidence: float):
+    results = extract_batch([item["transcript"] for item in corpus])
+    accepted = correct = unsafe = missed = 0
+    field_hits = {field: 0 for field in FIELDS}
+
+    for item, result in zip(corpus, results):
+        label = item["label"]
+        is_accepted = result["confidence"] >= min_confidence
+        if not is_accepted:
+            missed += int(label["fast_path"])
+            continue
+        accepted += 1
+        if not label["fast_path"]:
+            unsafe += 1
+            print(f"UNSAFE ACCEPT: {item['transcript']!r} -> {result}")
+            continue
+
+        all_right = True
+        for field in FIELDS:
+            if result[field] == label[field]:
+                field_hits[field] += 1
+            else:
+                all_right = False
+                print(f"MISMATCH {field}: expected {label[field]!r}, got {result[field]!r} in {item['transcript']!r}")
+        correct += int(all_right)
+
+    total = len(corpus)
+    print(f"\nTranscripts:        {total}")
+    print(f"Accepted (fast):    {accepted} ({accepted / total:.0%} coverage)")
+    print(f"Unsafe accepts:     {unsafe}")
+    print(f"Missed fast paths:  {missed}")
+    safe_accepted = accepted - unsafe
+    if safe_accepted:
+        print(f"Exact match:        {correct}/{safe_accepted} ({correct / safe_accepted:.0%})")
+        for field in FIELDS:
+            print(f"  {field:<16}  {field_hits[field] / safe_accepted:.0%}")
+
+
+def benchmark(corpus, repeat: int, workers: int):
+    transcripts = [item["transcript"] for item in corpus] * repeat
+
+    started = time.perf_counter()
+    for transcript in transcripts:
+        extract(transcript)
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    extract_batch(transcripts, workers=workers)
+    batch = time.perf_counter() - started
+
+    print(f"\nSpeed over {len(transcripts)} transcripts:")
+    print(f"  one at a time:    {len(transcripts) / single:,.0f} transcripts/s ({single * 1e6 / len(transcripts):.1f} us each)")
+    print(f"  batch, {workers} workers: {len(transcripts) / batch:,.0f} transcripts/s ({batch * 1e6 / len(transcripts):.1f} us each)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=1000, help="times to repeat the corpus for the speed run")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes for the batch run")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    evaluate(corpus, args.min_confidence)
+    benchmark(corpus, args.repeat, args.workers)
+
+
+if __name__ == "__main__":
+    main()
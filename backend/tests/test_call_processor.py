@@ -0,0 +1,24 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.call_processor import CallProcessor
+
+ENDED = datetime(2024, 3, 1, 15, 30, 5, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("timestamp, expected", [
+    (1709307005000, ENDED),
+    (1709307005000.0, ENDED),
+    ("1709307005000", ENDED),
+    ("2024-03-01T15:30:05Z", ENDED),
+    ("2024-03-01T15:30:05+00:00", ENDED),
+    ("2024-03-01T15:30:05", ENDED),
+    ("2024-03-01T17:30:05+02:00", ENDED),
+    (None, None),
+    ("", None),
+    ("not a time", None),
+])
+def test_parse_timestamp(timestamp, expected):
+    processor = CallProcessor.__new__(CallProcessor)
+    assert processor._parse_timestamp(timestamp) == expected
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.services.reconciler import CallReconciler
+from app.services.retell_service import RetellService
+
+NOW = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def retell_returning(status_code, body=None):
+    service = RetellService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(status_code, json=body or {})
+    ))
+    return service
+
+
+class RecordingBuffer:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, table, key_column, key, values):
+        self.updates.append((key, values))
+
+
+def reconcile(retell_service, age):
+    buffer = RecordingBuffer()
+    reconciler = CallReconciler(call_processor=None, retell_service=retell_service, write_buffer=buffer)
+    call = {"id": "row-1", "call_id": "c1", "call_status": "in_progress", "started_at": (NOW - age).isoformat()}
+
+    async def run():
+        try:
+            return await reconciler._reconcile(call, NOW)
+        finally:
+            await retell_service.aclose()
+
+    return asyncio.run(run()), buffer.updates
+
+
+def test_find_call_returns_none_only_when_retell_has_no_record():
+    async def run(status_code):
+        service = retell_returning(status_code, {"call_id": "c1"})
+        try:
+            return await service.find_call("c1")
+        finally:
+            await service.aclose()
+
+    assert asyncio.run(run(200)) == {"call_id": "c1"}
+    assert asyncio.run(run(404)) is None
+    for status_code in (429, 500, 503):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(run(status_code))
+
+
+def test_call_missing_from_retell_is_abandoned_once_old():
+    assert reconcile(retell_returning(404), timedelta(days=2)) == ("failed", [("c1", {"call_status": "failed"})])
+    assert reconcile(retell_returning(404), timedelta(hours=1)) == ("skipped", [])
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_transient_retell_errors_never_abandon_a_call(status_code):
+    assert reconcile(retell_returning(status_code), timedelta(days=2)) == ("skipped", [])
+
+
+def test_timeout_never_abandons_a_call():
+    def time_out(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    service = RetellService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(time_out))
+    assert reconcile(service, timedelta(days=2)) == ("skipped", [])
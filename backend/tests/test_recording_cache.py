@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.recording_cache import RecordingCache, parse_range
+
+RECORDINGS = {
+    "/a.wav": b"RIFF\x00\x00\x00\x00WAVE" + b"a" * 4000,
+    "/b.wav": b"RIFF\x00\x00\x00\x00WAVE" + b"b" * 4000,
+}
+
+
+class RecordingServer:
+    """Local stand-in for Retell's recording storage that counts downloads"""
+
+    def __init__(self, delay_s: float = 0.2):
+        self.hits = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                body = RECORDINGS.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                time.sleep(delay_s)  # keep the download open long enough for requests to overlap
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = RecordingServer()
+    yield server
+    server.close()
+
+
+def resolver(url):
+    async def resolve():
+        return url
+    return resolve
+
+
+def test_concurrent_misses_share_one_download(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            files = await asyncio.gather(*(
+                cache.open("call-a", resolver(f"{server.url}/a.wav")) for _ in range(20)
+            ))
+            contents = []
+            for f in files:
+                with f:
+                    contents.append(f.read())
+            return contents
+        finally:
+            await cache.aclose()
+
+    contents = asyncio.run(run())
+    assert server.hits["/a.wav"] == 1
+    assert contents == [RECORDINGS["/a.wav"]] * 20
+
+
+def test_cached_recording_is_served_without_upstream(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            for _ in range(3):
+                with await cache.open("call-a", resolver(f"{server.url}/a.wav")) as f:
+                    assert f.read() == RECORDINGS["/a.wav"]
+        finally:
+            await cache.aclose()
+
+    asyncio.run(run())
+    assert server.hits["/a.wav"] == 1
+
+
+def test_missing_file_is_downloaded_again(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            (await cache.open("call-a", resolver(f"{server.url}/a.wav"))).close()
+            for path in tmp_path.iterdir():
+                path.unlink()
+            with await cache.open("call-a", resolver(f"{server.url}/a.wav")) as f:
+                return f.read()
+        finally:
+            await cache.aclose()
+
+    assert asyncio.run(run()) == RECORDINGS["/a.wav"]
+    assert server.hits["/a.wav"] == 2
+
+
+def test_recording_evicted_before_waiter_resumes_is_fetched_again(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        download = cache._download
+        evicted = []
+
+        async def download_then_evict(name, resolve_url):
+            # Another download finishing first evicts this one before open() resumes
+            path = await download(name, resolve_url)
+            if not evicted:
+                evicted.append(name)
+                cache._total_bytes -= cache._entries.pop(name)
+                path.unlink()
+            return path
+
+        cache._download = download_then_evict
+        try:
+            with await cache.open("call-a", resolver(f"{server.url}/a.wav")) as f:
+                return f.read()
+        finally:
+            await cache.aclose()
+
+    assert asyncio.run(run()) == RECORDINGS["/a.wav"]
+    assert server.hits["/a.wav"] == 2
+
+
+def test_open_handle_survives_eviction(server, tmp_path):
+    async def run():
+        # Room for one recording only, so caching b evicts a
+        cache = RecordingCache(str(tmp_path), max_bytes=len(RECORDINGS["/a.wav"]) + 10)
+        try:
+            f = await cache.open("call-a", resolver(f"{server.url}/a.wav"))
+            (await cache.open("call-b", resolver(f"{server.url}/b.wav"))).close()
+            assert len(list(tmp_path.iterdir())) == 1
+            with f:
+                return f.read()
+        finally:
+            await cache.aclose()
+
+    assert asyncio.run(run()) == RECORDINGS["/a.wav"]
+
+
+def test_no_recording_returns_none(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            return await cache.open("call-x", resolver(None))
+        finally:
+            await cache.aclose()
+
+    assert asyncio.run(run()) is None
+
+
+def test_upstream_error_is_raised_and_not_cached(server, tmp_path):
+    async def run():
+        cache = RecordingCache(str(tmp_path), max_bytes=1024 * 1024)
+        try:
+            with pytest.raises(Exception):
+                await cache.open("call-x", resolver(f"{server.url}/missing.wav"))
+        finally:
+            await cache.aclose()
+
+    asyncio.run(run())
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-0", (0, 0)),
+    ("bytes=0-10,20-30", None),
+    ("items=0-10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100", "bytes=-0", "bytes=abc-"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services import write_buffer as write_buffer_module
+from app.services.write_buffer import WriteBehindBuffer
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.op = None
+        self.rows = None
+        self.values = None
+        self.on_conflict = None
+        self.filters = {}
+
+    def upsert(self, rows, on_conflict=None):
+        self.op, self.rows, self.on_conflict = "upsert", rows, on_conflict
+        return self
+
+    def update(self, values):
+        self.op, self.values = "update", values
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = list(values)
+        return self
+
+    def execute(self):
+        self.db.statements.append((self.table, self.op))
+        if self.db.fail is not None and self.db.fail(self):
+            raise Exception("write failed")
+        table = self.db.tables.setdefault(self.table, {})
+        if self.op == "upsert":
+            for row in self.rows:
+                table[row[self.on_conflict]] = {**table.get(row[self.on_conflict], {}), **row}
+        else:
+            for row in table.values():
+                if all(row.get(column) in values for column, values in self.filters.items()):
+                    row.update(self.values)
+        return self
+
+
+class FakeDB:
+    """In-memory stand-in for the Supabase tables the buffer writes to"""
+
+    def __init__(self):
+        self.tables = {}
+        self.statements = []
+        self.fail = None
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(write_buffer_module, "get_db", lambda: db)
+    return db
+
+
+def call_row(call_id, status="initiated"):
+    return {"call_id": call_id, "call_status": status, "driver_name": "Mike"}
+
+
+def test_insert_and_updates_coalesce_into_one_upsert(db):
+    async def run():
+        buffer = WriteBehindBuffer()
+        buffer.insert("calls", call_row("c1"), key_column="call_id")
+        buffer.update("calls", "call_id", "c1", {"call_status": "in_progress"})
+        buffer.update("calls", "call_id", "c1", {"duration": 42})
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert db.statements == [("calls", "upsert")]
+    assert db.tables["calls"]["c1"] == {**call_row("c1", "in_progress"), "duration": 42}
+
+
+def test_identical_updates_share_one_statement(db):
+    db.tables["calls"] = {k: call_row(k) for k in ("c1", "c2", "c3")}
+
+    async def run():
+        buffer = WriteBehindBuffer()
+        for key in ("c1", "c2", "c3"):
+            buffer.update("calls", "call_id", key, {"call_status": "in_progress"})
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert db.statements == [("calls", "update")]
+    assert {row["call_status"] for row in db.tables["calls"].values()} == {"in_progress"}
+
+
+def test_buffered_status_never_moves_backwards(db):
+    async def run():
+        buffer = WriteBehindBuffer()
+        buffer.insert("calls", call_row("c1"), key_column="call_id")
+        buffer.update("calls", "call_id", "c1", {"call_status": "completed"})
+        buffer.update("calls", "call_id", "c1", {"call_status": "in_progress"})
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert db.tables["calls"]["c1"]["call_status"] == "completed"
+
+
+@pytest.mark.parametrize("stored, update, expected", [
+    ("completed", "in_progress", "completed"),
+    ("completed", "failed", "completed"),
+    ("failed", "completed", "completed"),
+    ("initiated", "in_progress", "in_progress"),
+])
+def test_stored_status_guard(db, stored, update, expected):
+    db.tables["calls"] = {"c1": call_row("c1", stored)}
+
+    async def run():
+        buffer = WriteBehindBuffer()
+        buffer.update("calls", "call_id", "c1", {"call_status": update})
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert db.tables["calls"]["c1"]["call_status"] == expected
+
+
+def test_bad_row_does_not_fail_the_rest_of_its_batch(db):
+    db.fail = lambda query: query.op == "upsert" and any(row["call_id"] == "bad" for row in query.rows)
+
+    async def run():
+        buffer = WriteBehindBuffer()
+        for key in ("c1", "bad", "c2"):
+            buffer.insert("calls", call_row(key), key_column="call_id")
+        await buffer.flush()
+        return list(buffer._pending)
+
+    pending = asyncio.run(run())
+    assert set(db.tables["calls"]) == {"c1", "c2"}
+    assert pending == [("calls", "call_id", "bad")]
+
+
+def test_write_made_during_a_failed_write_lands_after_it(db):
+    """A newer update must not reach the database ahead of the failed insert it follows"""
+    writing, release = threading.Event(), threading.Event()
+    failures = []
+
+    def fail_first_insert(query):
+        if query.op == "upsert" and not failures:
+            failures.append(query)
+            writing.set()
+            release.wait(5)
+            return True
+        return False
+
+    db.fail = fail_first_insert
+
+    async def run():
+        buffer = WriteBehindBuffer(retry_interval_s=0.01)
+        buffer.insert("calls", call_row("c1"), key_column="call_id")
+        flush = asyncio.create_task(buffer.flush())
+        while not writing.is_set():
+            await asyncio.sleep(0.001)
+        buffer.update("calls", "call_id", "c1", {"call_status": "in_progress"})
+        release.set()
+        await flush
+        await asyncio.sleep(0.02)
+        await buffer.flush()
+
+    asyncio.run(run())
+    assert ("calls", "update") not in db.statements
+    assert db.tables["calls"]["c1"]["call_status"] == "in_progress"
+
+
+def test_failed_row_waits_for_its_backoff_despite_new_writes(db):
+    db.fail = lambda query: query.op == "upsert" and any(row["call_id"] == "c1" for row in query.rows)
+
+    async def run():
+        buffer = WriteBehindBuffer(retry_interval_s=10)
+        buffer.insert("calls", call_row("c1"), key_column="call_id")
+        await buffer.flush()
+        for key in ("c2", "c3", "c4"):
+            buffer.insert("calls", call_row(key), key_column="call_id")
+            await buffer.flush()
+        return buffer._pending[("calls", "call_id", "c1")].attempts
+
+    assert asyncio.run(run()) == 1
+    assert set(db.tables["calls"]) == {"c2", "c3", "c4"}
+
+
+def test_rows_survive_an_outage_under_steady_load(db):
+    outage_until = time.monotonic() + 0.3
+    db.fail = lambda query: time.monotonic() < outage_until
+
+    async def run():
+        buffer = WriteBehindBuffer(retry_interval_s=0.05, max_retry_interval_s=0.2)
+        await buffer.start()
+        for i in range(150):
+            buffer.insert("calls", call_row(f"c{i}"), key_column="call_id")
+            await asyncio.sleep(0.002)
+        await asyncio.sleep(0.5)
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert len(db.tables["calls"]) == 150
+
+
+def test_row_is_dropped_only_after_failing_for_give_up_after(db):
+    db.fail = lambda query: True
+
+    async def run():
+        buffer = WriteBehindBuffer(retry_interval_s=0.01, max_retry_interval_s=0.01, give_up_after_s=0.2)
+        buffer.insert("calls", call_row("c1"), key_column="call_id")
+        await buffer.flush()
+        await asyncio.sleep(0.05)
+        await buffer.flush()
+        still_pending = bool(buffer._pending)
+        await asyncio.sleep(0.2)
+        await buffer.flush()
+        return still_pending, bool(buffer._pending)
+
+    assert asyncio.run(run()) == (True, False)
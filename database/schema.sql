@@ -51,6 +51,107 @@ CREATE TABLE call_results (
 
 
 
+-- Per-agent call analytics, pre-aggregated into hourly and daily buckets
+CREATE TABLE agent_call_rollups (
+    agent_config_id UUID REFERENCES agent_configs(id) ON DELETE CASCADE,
+    granularity VARCHAR(10) NOT NULL, -- 'hour' or 'day'
+    bucket_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    total_calls INTEGER NOT NULL DEFAULT 0,
+    total_duration BIGINT NOT NULL DEFAULT 0, -- in seconds
+    duration_samples INTEGER NOT NULL DEFAULT 0, -- calls with a known duration
+    escalated_calls INTEGER NOT NULL DEFAULT 0,
+    call_outcome_counts JSONB NOT NULL DEFAULT '{}',
+    driver_status_counts JSONB NOT NULL DEFAULT '{}',
+    emergency_type_counts JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (agent_config_id, granularity, bucket_start)
+);
+
+-- Increment the counter for a key in a JSONB object of counts
+CREATE OR REPLACE FUNCTION jsonb_increment(counts JSONB, counter_key TEXT) RETURNS JSONB AS $$
+    SELECT CASE
+        WHEN counter_key IS NULL THEN counts
+        ELSE counts || jsonb_build_object(counter_key, COALESCE((counts->>counter_key)::INTEGER, 0) + 1)
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Calls already counted in agent_call_rollups, so a call that is processed
+-- again (webhook retry, reconciler) is not counted twice
+CREATE TABLE agent_call_rollup_calls (
+    call_id UUID PRIMARY KEY REFERENCES calls(id) ON DELETE CASCADE,
+    recorded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Add one processed call to its agent's hourly and daily rollups, once per call
+CREATE OR REPLACE FUNCTION record_call_rollup(
+    p_call_id UUID,
+    p_agent_config_id UUID,
+    p_occurred_at TIMESTAMP WITH TIME ZONE,
+    p_duration INTEGER,
+    p_call_outcome TEXT,
+    p_driver_status TEXT,
+    p_emergency_type TEXT,
+    p_escalated BOOLEAN
+) RETURNS VOID AS $$
+DECLARE
+    g TEXT;
+BEGIN
+    INSERT INTO agent_call_rollup_calls (call_id) VALUES (p_call_id) ON CONFLICT DO NOTHING;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    FOREACH g IN ARRAY ARRAY['hour', 'day'] LOOP
+        INSERT INTO agent_call_rollups AS r (
+            agent_config_id, granularity, bucket_start, total_calls, total_duration,
+            duration_samples, escalated_calls, call_outcome_counts, driver_status_counts,
+            emergency_type_counts
+        ) VALUES (
+            p_agent_config_id, g, date_trunc(g, p_occurred_at), 1, COALESCE(p_duration, 0),
+            CASE WHEN p_duration IS NULL THEN 0 ELSE 1 END,
+            CASE WHEN p_escalated THEN 1 ELSE 0 END,
+            jsonb_increment('{}', p_call_outcome),
+            jsonb_increment('{}', p_driver_status),
+            jsonb_increment('{}', p_emergency_type)
+        )
+        ON CONFLICT (agent_config_id, granularity, bucket_start) DO UPDATE SET
+            total_calls = r.total_calls + 1,
+            total_duration = r.total_duration + EXCLUDED.total_duration,
+            duration_samples = r.duration_samples + EXCLUDED.duration_samples,
+            escalated_calls = r.escalated_calls + EXCLUDED.escalated_calls,
+            call_outcome_counts = jsonb_increment(r.call_outcome_counts, p_call_outcome),
+            driver_status_counts = jsonb_increment(r.driver_status_counts, p_driver_status),
+            emergency_type_counts = jsonb_increment(r.emergency_type_counts, p_emergency_type),
+            updated_at = NOW();
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute all rollups from stored calls and results
+CREATE OR REPLACE FUNCTION rebuild_agent_call_rollups() RETURNS INTEGER AS $$
+DECLARE
+    rec RECORD;
+    processed INTEGER := 0;
+BEGIN
+    DELETE FROM agent_call_rollups;
+    DELETE FROM agent_call_rollup_calls;
+    FOR rec IN
+        SELECT c.id, c.agent_config_id, COALESCE(c.ended_at, c.started_at) AS occurred_at, c.duration,
+               cr.call_outcome, cr.driver_status, cr.emergency_type, cr.escalation_status
+        FROM calls c
+        JOIN call_results cr ON cr.call_id = c.id
+        WHERE c.agent_config_id IS NOT NULL
+    LOOP
+        PERFORM record_call_rollup(
+            rec.id, rec.agent_config_id, rec.occurred_at, rec.duration, rec.call_outcome,
+            rec.driver_status, rec.emergency_type, rec.escalation_status = 'Escalation Flagged'
+        );
+        processed := processed + 1;
+    END LOOP;
+    RETURN processed;
+END;
+$$ LANGUAGE plpgsql;
+
 
 
 -- Insert default agent configurations
@@ -73,5 +174,15 @@ INSERT INTO agent_configs (name, scenario_type, system_prompt, conversation_flow
 -- Create indexes for better performance
 CREATE INDEX idx_calls_status ON calls(call_status);
 CREATE INDEX idx_calls_created_at ON calls(created_at);
-CREATE INDEX idx_call_results_call_id ON call_results(call_id);
-CREATE INDEX idx_agent_configs_scenario ON agent_configs(scenario_type);
\ No newline at end of file
+CREATE UNIQUE INDEX idx_call_results_call_id ON call_results(call_id); -- one result per call; upserts conflict on it
+CREATE INDEX idx_agent_configs_scenario ON agent_configs(scenario_type);
+
+-- Keyset pagination: each (filter, sort) combination the list endpoints
+-- allow is served by an index range scan in (sort column, id) order
+CREATE INDEX idx_calls_started_at_id ON calls(started_at DESC, id DESC);
+CREATE INDEX idx_calls_status_started_at_id ON calls(call_status, started_at DESC, id DESC);
+CREATE INDEX idx_calls_agent_started_at_id ON calls(agent_config_id, started_at DESC, id DESC);
+CREATE INDEX idx_calls_agent_status_started_at_id ON calls(agent_config_id, call_status, started_at DESC, id DESC);
+CREATE INDEX idx_agent_configs_created_at_id ON agent_configs(created_at DESC, id DESC);
+CREATE INDEX idx_agent_configs_scenario_created_at_id ON agent_configs(scenario_type, created_at DESC, id DESC);
+CREATE INDEX idx_agent_call_rollups_bucket ON agent_call_rollups(granularity, bucket_start);
\ No newline at end of file
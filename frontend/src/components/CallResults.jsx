@@ -7,6 +7,8 @@ const CallResults = () => {
   const [calls, setCalls] = useState([]);
   const [selectedCall, setSelectedCall] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [detailsLoading, setDetailsLoading] = useState(false);
 
   useEffect(() => {
@@ -15,9 +17,10 @@ const CallResults = () => {
 
   const fetchCalls = async () => {
     try {
-      const response = await callsApi.getAll();
+      const response = await callsApi.getPage();
       if (response.data.success) {
         setCalls(response.data.data);
+        setNextCursor(response.data.next_cursor);
       }
     } catch (error) {
       toast.error('Failed to fetch calls');
@@ -26,6 +29,21 @@ const CallResults = () => {
     }
   };
 
+  const fetchMoreCalls = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await callsApi.getPage({ cursor: nextCursor });
+      if (response.data.success) {
+        setCalls(prev => [...prev, ...response.data.data]);
+        setNextCursor(response.data.next_cursor);
+      }
+    } catch (error) {
+      toast.error('Failed to fetch calls');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchCallDetails = async (callId) => {
     setDetailsLoading(true);
     try {
@@ -339,6 +357,17 @@ const CallResults = () => {
             ))
           )}
         </ul>
+        {nextCursor && (
+          <div className="px-6 py-4 border-t border-gray-200 text-center">
+            <button
+              onClick={fetchMoreCalls}
+              disabled={loadingMore}
+              className="text-blue-600 hover:text-blue-900 text-sm font-medium disabled:opacity-50"
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Call Details Modal */}
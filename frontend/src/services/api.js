@@ -18,9 +18,23 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return one page at a time; follow next_cursor to the end
+// for lists the UI needs in full
+const getAllPages = async (url, params = {}) => {
+  const data = [];
+  let cursor;
+  do {
+    const response = await api.get(url, { params: { ...params, cursor } });
+    if (!response.data.success) return response;
+    data.push(...response.data.data);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return { data: { success: true, data } };
+};
+
 // Agent Configuration API
 export const agentConfigApi = {
-  getAll: () => api.get('/agent-configs'),
+  getAll: () => getAllPages('/agent-configs', { limit: 200 }),
   getById: (id) => api.get(`/agent-configs/${id}`),
   create: (data) => api.post('/agent-configs', data),
   update: (id, data) => api.put(`/agent-configs/${id}`, data),
@@ -29,7 +43,8 @@ export const agentConfigApi = {
 
 // Calls API
 export const callsApi = {
-  getAll: () => api.get('/calls'),
+  // One page, newest first; pass the previous page's next_cursor as cursor
+  getPage: (params = {}) => api.get('/calls', { params }),
   getById: (id) => api.get(`/calls/${id}`),
   getResults: (id) => api.get(`/calls/${id}/results`),
   startWebRTC: (data) => api.post('/calls/start', data),